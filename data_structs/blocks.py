@@ -0,0 +1,115 @@
+import numpy as np
+import astropy.units as u
+
+
+def slabs(shape, axis=-1, block_cells=2**22, index=None, chunk=None):
+  ''' generate index tuples of slabs along an axis covering an array, or a region of it
+
+  Args:
+    shape (tuple): shape of the array
+    axis (int): axis along which the array is split. Default is -1, the last axis, \
+        whose slabs are contiguous in the Fortran-ordered outputs of PLUTO.
+    block_cells (int): maximum number of cells in a slab, a slab has at least one layer. Default is 2**22.
+    index (tuple): slices of the region. Default is None, the whole array.
+    chunk (int): number of layers in a slab, overrides `block_cells`. (optional)
+  '''
+
+  if index is None:
+    index = tuple(slice(0, n) for n in shape)
+  index = list(index)
+  axis = axis % len(shape)
+  along = index[axis]
+  if chunk is None:
+    cells = int(np.prod([i.stop - i.start for k, i in enumerate(index) if k != axis]))
+    chunk = max(1, block_cells // max(1, cells))
+  for k in range(along.start, along.stop, chunk):
+    index[axis] = slice(k, min(k+chunk, along.stop))
+    yield tuple(index)
+
+
+def evaluate(func, shape, axis=-1, block_cells=2**22, allocate=None):
+  ''' evaluate a function slab by slab and gather the results
+
+  Args:
+    func (callable): function taking the index of a slab and returning the values in it, \
+        or a tuple of values for several outputs
+    shape (tuple): shape of the output
+    axis, block_cells: refer to slabs()
+    allocate (callable): function taking shape and dtype and returning an array to be filled, \
+        e.g. a `numpy.memmap` for outputs larger than memory. Default is None, `numpy.empty` in Fortran order.
+
+  Returns:
+    numpy.ndarray/units.Quantity: the output, or a tuple of outputs
+  '''
+
+  if allocate is None:
+    allocate = lambda shape, dtype: np.empty(shape, dtype=dtype, order='F')
+
+  outs = None
+  units = None
+  single = False
+  for index in slabs(shape, axis, block_cells):
+    values = func(index)
+    if outs is None:
+      single = not isinstance(values, tuple)
+      values = (values,) if single else values
+      outs = [allocate(shape, np.result_type(getattr(v, 'value', v))) for v in values]
+      units = [getattr(v, 'unit', None) for v in values]
+    elif single:
+      values = (values,)
+    for out, v, unit in zip(outs, values, units):
+      out[index] = v.to_value(unit) if unit is not None else v
+
+  if outs is None:
+    return None
+  outs = [out if unit is None else u.Quantity(out, unit, copy=False) for out, unit in zip(outs, units)]
+  return outs[0] if single else tuple(outs)
+
+
+class BlockView(object):
+  ''' A slab of a snapshot, whose `fields` and `grids` return the values in the slab, \
+  passed to functions of derived fields instead of the snapshot
+
+  Args:
+    snapshot (Snapshot): the snapshot
+    index (tuple): index of the slab
+  '''
+
+  __slots__ = ['snapshot', 'index', 'fields', 'grids']
+
+  def __init__(self, snapshot, index):
+    self.snapshot = snapshot
+    self.index = index
+    self.fields = _BlockFields(snapshot.fields, index)
+    self.grids = _BlockGrids(snapshot.grids, index)
+
+  def __getattr__(self, name):
+    return getattr(self.snapshot, name)
+
+
+class _BlockFields(object):
+  __slots__ = ['fields', 'index']
+
+  def __init__(self, fields, index):
+    self.fields = fields
+    self.index = index
+
+  def __getitem__(self, name):
+    return self.fields.region(name, self.index)
+
+  def __getattr__(self, name):
+    return getattr(self.fields, name)
+
+
+class _BlockGrids(object):
+  __slots__ = ['grids', 'index']
+
+  def __init__(self, grids, index):
+    self.grids = grids
+    self.index = index
+
+  def __getitem__(self, key):
+    return self.grids.block(key, self.index)
+
+  def __getattr__(self, name):
+    return getattr(self.grids, name)
@@ -0,0 +1,296 @@
+import os
+import types
+import inspect
+import functools
+import hashlib
+import numpy as np
+from collections import OrderedDict
+
+from .reader import is_mapped
+
+
+class FieldCache(object):
+  ''' Cache of field arrays with a memory budget and LRU eviction
+
+  Args:
+    budget (int): memory budget in bytes, memory-mapped arrays are not counted. Default is None, no limit.
+
+  Attributes:
+    hits (int): number of accesses to cached arrays
+    misses (int): number of accesses to arrays not cached
+    evictions (int): number of evicted arrays
+    nbytes (int): memory of cached arrays in bytes
+    fixed (set): names of arrays assigned by users
+
+  Methods:
+    put(name, value, fixed=False):
+    pin(name):
+    unpin(name):
+    stats():
+  '''
+
+  __slots__ = [
+    'budget',
+    'hits',
+    'misses',
+    'evictions',
+    '_data',
+    '_pinned',
+    '_fixed'
+  ]
+
+  def __init__(self, budget=None):
+    self.budget = budget
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+    self._data = OrderedDict()
+    self._pinned = set()
+    self._fixed = set()
+
+  def __contains__(self, name):
+    return name in self._data
+
+  def __len__(self):
+    return len(self._data)
+
+  def __iter__(self):
+    return iter(list(self._data))
+
+  def __getitem__(self, name):
+    self._data.move_to_end(name)
+    return self._data[name]
+
+  def __setitem__(self, name, value):
+    self.put(name, value, fixed=name in self._fixed)
+
+  def __delitem__(self, name):
+    del self._data[name]
+    self._fixed.discard(name)
+
+  @property
+  def fixed(self):
+    ''' names of arrays assigned by users '''
+
+    return set(self._fixed)
+
+  @staticmethod
+  def _nbytes(value):
+    if is_mapped(value):
+      return 0
+    return getattr(value, 'nbytes', 0)
+
+  @property
+  def nbytes(self):
+    return sum(self._nbytes(value) for value in self._data.values())
+
+  def put(self, name, value, fixed=False):
+    ''' cache an array as the most recently used one, and evict others if over budget
+
+    Args:
+      name (str): field name
+      value (numpy.ndarray): array
+      fixed (bool): whether the array cannot be restored once evicted. Default is False.
+    '''
+
+    self._data[name] = value
+    self._data.move_to_end(name)
+    if fixed:
+      self._fixed.add(name)
+    else:
+      self._fixed.discard(name)
+    self._evict(keep=name)
+
+  def _evict(self, keep=None):
+    if self.budget is None:
+      return
+    nbytes = self.nbytes
+    for name in list(self._data):
+      if nbytes <= self.budget:
+        break
+      size = self._nbytes(self._data[name])
+      if size == 0 or name == keep or name in self._pinned or name in self._fixed:
+        continue  # evicting mapped arrays frees no memory
+      del self._data[name]
+      nbytes -= size
+      self.evictions += 1
+
+  def pin(self, name):
+    ''' keep an array in the cache regardless of the budget '''
+
+    self._pinned.add(name)
+
+  def unpin(self, name):
+    self._pinned.discard(name)
+    self._evict()
+
+  def stats(self):
+    ''' statistics of the cache
+
+    Returns:
+      dict: hits, misses, evictions, number of cached arrays, bytes in memory and the budget
+    '''
+
+    return {
+      'hits': self.hits,
+      'misses': self.misses,
+      'evictions': self.evictions,
+      'cached': len(self._data),
+      'bytes': self.nbytes,
+      'budget': self.budget
+    }
+
+
+class DiskCache(object):
+  ''' Persistent cache of derived fields in memory-mapped .npy files
+
+  Args:
+    cache_dir (str): directory of cached files
+
+  Methods:
+    key(name, ns, functions, units, sources=()):
+    load(key):
+    save(key, value):
+    create(key, shape, dtype):
+    commit(key):
+    clear():
+  '''
+
+  __slots__ = ['cache_dir', '_pending']
+
+  def __init__(self, cache_dir):
+    self.cache_dir = os.path.abspath(cache_dir) + '/'
+    self._pending = {}
+
+  @classmethod
+  def _source(cls, function, depth=0):
+    ''' text identifying a function
+
+    Returns:
+      str: its code and the state captured by defaults, closures, partial arguments or the bound instance
+    '''
+
+    if isinstance(function, functools.partial):
+      return cls._source(function.func, depth) + cls._state((function.args, function.keywords), depth)
+    try:
+      text = inspect.getsource(function)
+    except (OSError, TypeError):
+      code = getattr(function, '__code__', None)
+      if code is None:  # callable instances
+        return cls._state(function, depth)
+      text = cls._state(code, depth)
+    state = [getattr(function, '__defaults__', None), getattr(function, '__kwdefaults__', None), \
+        getattr(function, '__self__', None)]
+    for cell in getattr(function, '__closure__', None) or []:
+      try:
+        state.append(cell.cell_contents)
+      except ValueError:  # empty cell
+        state.append(None)
+    return text + cls._state(state, depth)
+
+  @classmethod
+  def _state(cls, value, depth=0):
+    ''' deterministic text of captured state, arrays are identified by a hash of their contents '''
+
+    depth += 1
+    if depth > 8:  # e.g. reference cycles
+      return type(value).__qualname__
+    if isinstance(value, np.ndarray):
+      digest = hashlib.sha1(np.ascontiguousarray(value).tobytes()).hexdigest()
+      return f'ndarray({value.dtype.str}, {value.shape}, {getattr(value, "unit", "")}, {digest})'
+    if value is None or isinstance(value, (bool, int, float, complex, str, bytes, np.generic)):
+      return repr(value)
+    if isinstance(value, (list, tuple)):
+      return type(value).__name__ + '(' + ', '.join(cls._state(v, depth) for v in value) + ')'
+    if isinstance(value, (set, frozenset)):
+      return type(value).__name__ + '(' + ', '.join(sorted(cls._state(v, depth) for v in value)) + ')'
+    if isinstance(value, dict):
+      items = sorted(f'{cls._state(k, depth)}: {cls._state(v, depth)}' for k, v in value.items())
+      return '{' + ', '.join(items) + '}'
+    if isinstance(value, types.CodeType):
+      return repr(value.co_code) + cls._state(value.co_consts, depth)
+    if inspect.ismodule(value):
+      return value.__name__
+    if inspect.isroutine(value) or isinstance(value, functools.partial):
+      return cls._source(value, depth)
+
+    # other objects by the source of their class and their attributes, since the default repr has the address
+    try:
+      text = inspect.getsource(type(value))
+    except (OSError, TypeError):
+      text = f'{type(value).__module__}.{type(value).__qualname__}'
+    if hasattr(value, '__dict__'):
+      attrs = dict(vars(value))
+    else:
+      slots = [name for klass in type(value).__mro__ for name in getattr(klass, '__slots__', [])]
+      attrs = {name: getattr(value, name) for name in slots if hasattr(value, name)}
+    if len(attrs) == 0 and type(value).__repr__ is not object.__repr__:
+      return text + repr(value)
+    return text + cls._state(attrs, depth)
+
+  def key(self, name, ns, functions, units, sources=()):
+    ''' file name of a cached field
+
+    Args:
+      name (str): field name
+      ns (int): number of output
+      functions (list): functions computing the field and its derived inputs
+      units (tuple): anything determining the units of the result, e.g. unit system and unit strings
+      sources (list): data files of the inputs, their paths, sizes and modification times are hashed
+
+    Returns:
+      str: name after the field, the output and a hash of the arguments
+    '''
+
+    h = hashlib.sha1()
+    for function in functions:
+      h.update(self._source(function).encode())
+    h.update(repr(units).encode())
+    for source in sources:
+      if os.path.exists(source):
+        stat = os.stat(source)
+        h.update(f'{source}{stat.st_size}{stat.st_mtime_ns}'.encode())
+    return f'{name}.{ns:04d}.{h.hexdigest()[:16]}.npy'
+
+  def load(self, key):
+    ''' memory-map a cached array copy-on-write, None if not cached '''
+
+    path = self.cache_dir + key
+    if not os.path.exists(path):
+      return None
+    return np.load(path, mmap_mode='c')
+
+  def save(self, key, value):
+    ''' save an array, the file is written to a temporary file first so that parallel readers never see a partial file '''
+
+    os.makedirs(self.cache_dir, exist_ok=True)
+    with open(self._tmp(key), 'wb') as f:
+      np.save(f, np.asarray(value))
+    os.replace(self._tmp(key), self.cache_dir + key)
+
+  def _tmp(self, key):
+    return self.cache_dir + f'.{key}.{os.getpid()}.tmp'
+
+  def create(self, key, shape, dtype):
+    ''' create a memory-mapped array to be filled, e.g. block by block, which is saved by commit() '''
+
+    os.makedirs(self.cache_dir, exist_ok=True)
+    arr = np.lib.format.open_memmap(self._tmp(key), mode='w+', dtype=dtype, shape=shape, fortran_order=True)
+    self._pending[key] = arr
+    return arr
+
+  def commit(self, key):
+    ''' save an array created by create() '''
+
+    arr = self._pending.pop(key)
+    arr.flush()
+    del arr
+    os.replace(self._tmp(key), self.cache_dir + key)
+
+  def clear(self):
+    ''' remove all cached files '''
+
+    if os.path.isdir(self.cache_dir):
+      for fname in os.listdir(self.cache_dir):
+        if fname.endswith('.npy'):
+          os.remove(self.cache_dir + fname)
@@ -0,0 +1,101 @@
+class CartesianView(object):
+  ''' Cartesian view of a snapshot in SPHERICAL or POLAR geometry, the snapshot is not changed
+
+  `grids['x1']`, `grids['x2']` and `grids['x3']` are x, y and z, and vector fields have cartesian
+  components, e.g. `fields['vx1']` is vx. Other grids, fields and attributes are those of the snapshot.
+
+  Args:
+    snapshot (Snapshot): the snapshot
+    vectors (list): triples of names of vector fields, e.g. [('vx1', 'vx2', 'vx3')]. \
+        Default is None, velocity and magnetic field if they are in `field_list`.
+
+  Methods:
+    slice2d(type, field, x1=None, x2=None, x3=None):
+    slice1d(type, field, x1=None, x2=None, x3=None):
+  '''
+
+  __slots__ = ['snapshot', 'vectors', 'grids', 'fields']
+
+  def __init__(self, snapshot, vectors=None):
+    if snapshot.geometry not in ['SPHERICAL', 'POLAR']:
+      raise KeyError('Only support geometry of [SPHERICAL] and [POLAR].')
+    if vectors is None:
+      vectors = [tuple(v+str(i) for i in range(1, 4)) for v in ['vx', 'Bx']]
+      vectors = [triple for triple in vectors if all(name in snapshot.field_list for name in triple)]
+
+    self.snapshot = snapshot
+    self.vectors = [tuple(triple) for triple in vectors]
+    self.grids = _CartesianGrids(snapshot.grids)
+    self.fields = _CartesianFields(snapshot.fields, self.vectors)
+
+  def __getattr__(self, name):
+    return getattr(self.snapshot, name)
+
+  def __repr__(self):
+    return f'CartesianView({self.snapshot.nstep}, vectors={self.vectors})'
+
+  def _region(self, type, field, index):
+    return getattr(self, type).region(field, index)
+
+  def slice2d(self, type, field, x1=None, x2=None, x3=None):
+    ''' refer to Snapshot.slice2d() '''
+
+    return self.snapshot.__class__.slice2d(self, type, field, x1=x1, x2=x2, x3=x3)
+
+  def slice1d(self, type, field, x1=None, x2=None, x3=None):
+    ''' refer to Snapshot.slice1d() '''
+
+    return self.snapshot.__class__.slice1d(self, type, field, x1=x1, x2=x2, x3=x3)
+
+
+class _CartesianGrids(object):
+  __slots__ = ['grids', '_xyz']
+
+  keys = ['x1', 'x2', 'x3']
+
+  def __init__(self, grids):
+    self.grids = grids
+    self._xyz = None
+
+  def __getitem__(self, key):
+    if key in self.keys:
+      if self._xyz is None:
+        self._xyz = self.grids.cartesian()
+      return self._xyz[self.keys.index(key)]
+    return self.grids[key]
+
+  def __getattr__(self, name):
+    return getattr(self.grids, name)
+
+  def region(self, key, index):
+    if key in self.keys:
+      return self.grids.cartesian(index)[self.keys.index(key)]
+    return self.grids.block(key, index)
+
+
+class _CartesianFields(object):
+  __slots__ = ['fields', 'components', '_values']
+
+  def __init__(self, fields, vectors):
+    self.fields = fields
+    self.components = {name: (triple, i) for triple in vectors for i, name in enumerate(triple)}
+    self._values = {}
+
+  def __getitem__(self, name):
+    if name in self.components:
+      triple, i = self.components[name]
+      if triple not in self._values:
+        self._values[triple] = self.fields.to_cartesian(*triple)
+      return self._values[triple][i]
+    return self.fields[name]
+
+  def __getattr__(self, name):
+    return getattr(self.fields, name)
+
+  def region(self, name, index):
+    if name in self.components:
+      triple, i = self.components[name]
+      if triple in self._values:
+        return self._values[triple][i][index]
+      return self.fields.to_cartesian(*triple, index=index)[i]
+    return self.fields.region(name, index)
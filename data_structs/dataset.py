@@ -1,13 +1,29 @@
 import os
-import pandas as pd
+import glob
+import json
+import time
+import functools
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 import astropy.units as u
-import pyPLUTO.pload as pp
 
 from ..pluto_def_constants import PlutoDefConstants
 from ..pluto_fluid_info import PlutoFluidInfo
 from ..utilities.tools import nearest
 from .grid import Grid
 from .field import Field
+from .reader import Reader, PloadReader, OutputLog, read_grid
+from .series import SnapshotSeries
+from .cache import DiskCache
+from .blocks import slabs, evaluate
+from .cartesian import CartesianView
+from .regrid import Regridder
+from .store import StoreReader, write_grid, write_output, default_chunks, read_grid as read_store_grid
+
+
+# readers of the datatypes read natively, others are read by pyPLUTO
+_readers = dict.fromkeys(Reader.dtypes, Reader)
+_readers[StoreReader.datatype] = StoreReader
 
 
 class Dataset(object):
@@ -15,8 +31,19 @@ class Dataset(object):
 
   Args:
     code_dir (str): path to the directory where data files locate. Default is './'.
-    datatype (str): type of data files. Default is 'dbl'.
+    datatype (str): type of data files. Default is 'dbl'. 'store' reads the outputs converted by convert().
     init_file (str): init file including the parameters for simulation. Default is 'pluto.ini'.
+    with_units (bool/str): whether to assign units to snapshots. Default is False. \
+        If it is 'metadata', arrays stay raw in code units and astro units are kept as metadata, \
+        refer to Snapshot.in_astro_unit().
+    lazy (bool): whether to read a field of snapshots only on its first access. Default is False.
+    cache_budget (int): memory budget in bytes of cached fields of each snapshot. Default is None, no limit.
+    disk_cache (bool/str): whether to keep derived fields on disk across sessions, \
+        in `output_dir`/.plutopy_cache or the given directory. Default is False.
+    block_cells (int): number of cells in a block (slab) processed at a time by blocked operations, \
+        e.g. reductions, derived fields and cartesian transforms. Default is 2**22.
+    block_axis (str): coordinate along which snapshots are split into slabs, e.g. 'x3' or 'x1'. \
+        Default is None, the last axis, whose slabs are contiguous in the data files.
 
   Attributes:
     code_dir (str): absolute path to the dirctory.
@@ -33,6 +60,14 @@ class Dataset(object):
 
   Methods:
     info():
+    series(numbers=None, fields=None, prefetch=1):
+    between(t0, t1, fields=None, prefetch=1):
+    map(func, indices=None, workers=None, reduce=None):
+    convert(indices=None, fields=None, dtype=None, chunks=None, format=None, workers=None):
+    watch(start=None, interval=1.0, timeout=None):
+    follow(*callbacks, start=None, interval=1.0, timeout=None):
+    phase(xfield, yfield, bins, range, weight='dV', log=False, indices=None, workers=None):
+    regridder(resolution=512, extent=None, method='nearest', x1=None, x2=None, x3=None):
   '''
 
   __slots__=[
@@ -48,16 +83,28 @@ class Dataset(object):
     'field_list',
     'derived_fields',
     'with_units',
-    '__log_file',
+    'lazy',
+    'cache_budget',
+    'disk_cache',
+    'block_cells',
+    'block_axis',
+    '_grid_info',
+    '_trig',
+    '_regridders',
+    '_log',
     '__ds'
   ]
 
-  def __init__(self, code_dir='./', datatype='dbl', init_file='pluto.ini', with_units=False):
+  def __init__(self, code_dir='./', datatype='dbl', init_file='pluto.ini', with_units=False, lazy=False, cache_budget=None, disk_cache=False, block_cells=2**22, block_axis=None):
     self.code_dir = os.path.abspath(code_dir) + '/'
     self.init_file = init_file
     self.output_dir = self.code_dir
     self.datatype = datatype
     self.with_units = with_units
+    self.lazy = lazy
+    self.cache_budget = cache_budget
+    self.block_cells = block_cells
+    self.block_axis = block_axis
 
     with open(self.code_dir+self.init_file, 'r') as f:
       for line in f.readlines():
@@ -65,19 +112,23 @@ class Dataset(object):
           output_dir = line.split()[-1].splitlines()[0] + '/'
           self.output_dir = self.code_dir + output_dir
 
-    varfile = self.output_dir+self.datatype+'.out'
-    with open(varfile,'r') as vfp:
-      varinfo = vfp.read().splitlines()
-      lastline = varinfo[-1].split()
-      self.filetype = lastline[4]
-      self.endianess = lastline[5]
-      self.field_list = lastline[6:]
-      self.derived_fields = []
-      self.geometry = 'CARTESIAN'
+    if disk_cache:
+      cache_dir = disk_cache if isinstance(disk_cache, str) else self.output_dir+'.plutopy_cache'
+      self.disk_cache = DiskCache(cache_dir)
+    else:
+      self.disk_cache = None
 
-    for k, v in PlutoFluidInfo.known_fields.items():
-      if v[0] is not None:
-        self.derived_fields.append(k)
+    self._log = OutputLog(self.output_dir+self.datatype+'.out')
+    lastline = self._log.lastline
+    self.filetype = lastline[4]
+    self.endianess = lastline[5]
+    self.field_list = lastline[6:]
+    self.geometry = 'CARTESIAN'
+
+    self.derived_fields = self._known_derived_fields()
+    self._grid_info = None
+    self._trig = {}   # sine and cosine of angular coordinates, shared by snapshots
+    self._regridders = {}
 
     # Three base units and default values in pluto code
     self.code_unit={
@@ -130,18 +181,348 @@ class Dataset(object):
     self.code_unit['code_force'] = self.code_unit['code_pressure']*code_length*code_length
 
   def __getitem__(self, index):
-    # index: int or time
+    # index: int or time, or slice of them
+    if isinstance(index, slice):
+      return self._slice(index)
     ns = self._number_step(index)
-    ds = Snapshot(ns, code_dir=self.code_dir, datatype=self.datatype, init_file=self.init_file, with_units=self.with_units)
+    ds = Snapshot(ns, code_dir=self.code_dir, datatype=self.datatype, init_file=self.init_file, with_units=self.with_units, lazy=self.lazy, dataset=self, cache_budget=self.cache_budget)
     return ds
 
 
+  def __len__(self):
+    return len(self._log)
+
+
+  def __iter__(self):
+    return iter(self.series())
+
+
+  def series(self, numbers=None, fields=None, prefetch=1):
+    ''' time series of snapshots, which are read in a background thread while iterating
+
+    Args:
+      numbers (list): numbers of output files. Default is None, all outputs.
+      fields (list): fields read in the background. Default is None, all primal fields.
+      prefetch (int): number of snapshots read ahead. Default is 1.
+
+    Returns:
+      SnapshotSeries
+    '''
+
+    self._log.refresh()
+    if numbers is None:
+      numbers = self._log.nfile
+    return SnapshotSeries(self, numbers, fields=fields, prefetch=prefetch)
+
+
+  def between(self, t0, t1, fields=None, prefetch=1):
+    ''' time series of snapshots whose time is in [t0, t1]
+
+    Args:
+      t0 (float): start time
+      t1 (float): end time
+      Other arguments refer to series()
+
+    Returns:
+      SnapshotSeries
+    '''
+
+    self._log.refresh()
+    log = self._log
+    i0 = np.searchsorted(log.time, t0, side='left')
+    i1 = np.searchsorted(log.time, t1, side='right')
+    return SnapshotSeries(self, log.nfile[i0:i1], fields=fields, prefetch=prefetch)
+
+
+  def map(self, func, indices=None, workers=None, reduce=None, chunksize=1):
+    ''' apply a function to snapshots, in parallel processes if `workers` > 1
+
+    Args:
+      func (callable): function taking a Snapshot as the only argument. \
+          It should be picklable (e.g. defined at the top level of a module) when `workers` > 1.
+      indices (list/SnapshotSeries): indices (int or time) of snapshots. Default is None, all outputs.
+      workers (int): number of worker processes. Default is None, run in the current process.
+      reduce (callable): function of two arguments to reduce the results cumulatively. (optional)
+      chunksize (int): number of snapshots sent to a worker at a time. Default is 1.
+
+    Returns:
+      list: results in the order of `indices`, or the reduced result if `reduce` is given
+    '''
+
+    if indices is None:
+      self._log.refresh()
+      indices = self._log.nfile.tolist()
+    elif isinstance(indices, SnapshotSeries):
+      indices = indices.numbers
+
+    if workers is None or workers <= 1:
+      results = [func(self[index]) for index in indices]
+    else:
+      disk_cache = False if self.disk_cache is None else self.disk_cache.cache_dir
+      args = (self.code_dir, self.datatype, self.init_file, self.with_units, self.lazy, self.cache_budget, disk_cache, \
+          self.block_cells, self.block_axis)
+      tasks = [(args, func, index) for index in indices]
+      with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(_map_worker, tasks, chunksize=chunksize))
+
+    if reduce is not None:
+      return functools.reduce(reduce, results)
+    return results
+
+
+  def convert(self, indices=None, fields=None, dtype=None, chunks=None, format=None, workers=None):
+    ''' convert outputs into a chunked and compressed store in `output_dir`/store/, read by `Dataset(datatype='store')`
+
+    Args:
+      indices (list): numbers of outputs, those already in store.out are skipped. Default is None, all outputs.
+      fields (list): fields to be converted. Default is None, all fields in `field_list`.
+      dtype (str): data type in the store, e.g. 'f4' to downcast to float32. Default is None, that of data files.
+      chunks (tuple): shape of chunks. Default is None, slabs along the last axis of about 2**20 cells.
+      format (str): 'npz' (a zip of deflated .npy chunks) or 'hdf5' (requires h5py). Default is 'npz'.
+      workers (int): number of worker processes, refer to map(). Default is None, run in the current process.
+
+    Returns:
+      str: directory of the store
+    '''
+
+    if self.datatype == StoreReader.datatype:
+      raise TypeError('The outputs are already in a store.')
+    source = Dataset(self.code_dir, self.datatype, self.init_file, lazy=True, block_cells=self.block_cells)  # in code units
+    log = source._log
+    if indices is None:
+      indices = log.nfile.tolist()
+    if len(indices) == 0:
+      raise FileNotFoundError(f'No outputs to be converted in {self.output_dir}.')
+    first = source[int(indices[0])]
+    store_dir = self.output_dir + 'store/'
+    os.makedirs(store_dir, exist_ok=True)
+
+    layout = {'format': format, 'fields': fields, 'dtype': dtype, 'chunks': chunks}
+    if os.path.exists(store_dir + 'index.json'):
+      with open(store_dir + 'index.json', 'r') as f:
+        meta = json.load(f)
+      given = {key: value for key, value in layout.items() if value is not None}
+      given['dtype'] = np.dtype(given.get('dtype', meta['dtype'])).newbyteorder('<').str
+      if any(list(value) != meta[key] if isinstance(value, (list, tuple)) else value != meta[key] for key, value in given.items()):
+        raise ValueError(f'The store in {store_dir} has a different layout {meta}, remove it to convert again.')
+    else:
+      shape = first.grids.shape()
+      meta = {
+        'format': format or 'npz',
+        'fields': list(fields or source.field_list),
+        'shape': list(shape),
+        'chunks': list(chunks or default_chunks(shape)),
+        'dtype': np.dtype(dtype or Reader.dtypes.get(self.datatype, 'f8')).newbyteorder('<').str,
+        'geometry': self.geometry,
+        'ndim': self.ndim,
+        'source': self.datatype
+      }
+      if meta['format'] not in ['npz', 'hdf5']:
+        raise ValueError(f'Format should be one of [npz, hdf5], now it is {meta["format"]}.')
+      write_grid(store_dir, first.index, first.coord)
+      with open(store_dir + 'index.json', 'w') as f:
+        json.dump(meta, f, indent=2)
+
+    # the log is rewritten in the order of outputs after they are converted
+    lines = {}
+    store_log = self.output_dir + 'store.out'
+    if os.path.exists(store_log):
+      with open(store_log, 'r') as f:
+        lines = {int(line.split()[0]): line for line in f if len(line.split()) > 3}
+    todo = [int(ns) for ns in indices if int(ns) not in lines]
+    source.map(functools.partial(write_output, store_dir, meta), todo, workers=workers)
+    for ns in todo:
+      i = log.position(ns)
+      lines[ns] = f'{ns} {float(log.time[i])!r} {float(log.dt[i])!r} {int(log.nstep[i])} chunked little {" ".join(meta["fields"])}\n'
+    with open(store_log + f'.{os.getpid()}.tmp', 'w') as f:
+      f.writelines(lines[ns] for ns in sorted(lines))
+    os.replace(store_log + f'.{os.getpid()}.tmp', store_log)
+    return store_dir
+
+
+  def watch(self, start=None, interval=1.0, timeout=None):
+    ''' follow a running simulation, yielding each new snapshot (again if rewritten after a restart) once complete
+
+    Args:
+      start (int): number of the first output to yield. Default is None, only outputs written from now on.
+      interval (float): seconds between polls. Default is 1.0.
+      timeout (float): seconds without new outputs after which watching stops. \
+          Default is None, watching until interrupted.
+
+    Yields:
+      Snapshot
+    '''
+
+    log = self._log
+    log.refresh()
+    if start is None:
+      first = 0
+      seen = dict(zip(log.nfile.tolist(), log.nstep.tolist()))
+    else:
+      first = int(np.searchsorted(log.nfile, start))
+      seen = {}
+    i = len(log) if start is None else first
+    sizes = {}
+    idle = time.monotonic()
+    while True:
+      if i > len(log) or (i > first and seen.get(int(log.nfile[i-1])) != int(log.nstep[i-1])):
+        i = first  # the log was rewritten after a restart
+      while i < len(log):
+        ns, nstep = int(log.nfile[i]), int(log.nstep[i])
+        if seen.get(ns) != nstep:
+          if not self._complete(ns, sizes):
+            break
+          seen[ns] = nstep
+          yield self[ns]
+          idle = time.monotonic()
+        i += 1
+      if timeout is not None and time.monotonic() - idle > timeout:
+        return
+      time.sleep(interval)
+      log.refresh()
+
+
+  def follow(self, *callbacks, start=None, interval=1.0, timeout=None):
+    ''' run callbacks on each new snapshot of a running simulation, refer to watch()
+
+    Args:
+      callbacks (callable): functions taking a Snapshot as the only argument, called in order
+      Other arguments refer to watch()
+
+    Returns:
+      int: number of snapshots processed
+    '''
+
+    count = 0
+    for snapshot in self.watch(start, interval, timeout):
+      for callback in callbacks:
+        callback(snapshot)
+      count += 1
+    return count
+
+
+  def _complete(self, ns, sizes):
+    ''' whether the data files of output `ns` are completely written
+
+    Args:
+      ns (int): number of the output file
+      sizes (dict): sizes of data files at the last poll, for formats whose sizes are unknown in advance
+
+    Returns:
+      bool: whether binary outputs reach their sizes, or other files are not growing since the last poll
+    '''
+
+    if self.datatype in _readers:
+      try:
+        index = self._read_grid()[0]
+      except FileNotFoundError:
+        return False
+      return _readers[self.datatype](ns, self, index).complete()
+
+    size = sum(os.stat(f).st_size for f in glob.glob(self.output_dir+f'*.{ns:04d}.{self.datatype}*'))
+    done = size > 0 and sizes.get(ns) == size
+    sizes[ns] = size
+    return done
+
+
+  def phase(self, xfield, yfield, bins, range, weight='dV', log=False, indices=None, workers=None, **kwargs):
+    ''' phase diagram (2-D weighted histogram) accumulated over snapshots, refer to map()
+
+    Args:
+      range (tuple): ((xmin, xmax), (ymin, ymax)), required unless bin edges are given, \
+          so that all snapshots share the same bins
+      indices (list/SnapshotSeries): indices (int or time) of snapshots. Default is None, all outputs.
+      workers (int): number of worker processes. Default is None, run in the current process.
+      **kwargs: mask, region and chunk passed to Snapshot.phase()
+      Other arguments refer to Snapshot.phase()
+
+    Returns:
+      tuple: (histogram, x edges, y edges)
+    '''
+
+    bins, log = _axis_pair(bins), _axis_pair(log)
+    range = (None, None) if range is None else range
+    edges = tuple(_histogram_edges(b, l, r) for b, l, r in zip(bins, log, range))
+    func = functools.partial(_phase_histogram, xfield, yfield, edges, weight, kwargs)
+    hist = self.map(func, indices=indices, workers=workers, reduce=np.add)
+    return (hist,) + edges
+
+
+  def regridder(self, resolution=512, extent=None, method='nearest', x1=None, x2=None, x3=None):
+    ''' map resampling a plane or volume of snapshots onto a uniform cartesian grid, shared by all snapshots
+
+    Args:
+      resolution (int/tuple): number of pixels along the longest side, or along each axis. Default is 512.
+      extent (tuple): (min, max) of each cartesian axis in the units of coordinates. \
+          Default is None, the bounding box of the data.
+      method (str): 'nearest' or 'linear'. Default is 'nearest'.
+      x1, x2, x3 (float): rough coordinate of the plane in 3-D data, e.g. x3=0 for the meridional plane \
+          of spherical data. Default is None, the whole volume (or plane in 2-D data).
+
+    Returns:
+      Regridder: refer to Regridder
+    '''
+
+    snapshot = self if hasattr(self, 'grids') else self[int(self._log.nfile[0])]
+    to_tuple = lambda x: tuple(to_tuple(i) for i in x) if np.ndim(x) else x
+    key = (to_tuple(resolution), None if extent is None else to_tuple(extent), method, x1, x2, x3, \
+        str(getattr(snapshot.coord['x1'], 'unit', '')))
+    if key not in self._regridders:
+      fixed = {}
+      for dim, x in zip(['x1', 'x2', 'x3'], [x1, x2, x3]):
+        if x is not None and dim in snapshot.grids.axes:
+          fixed[dim] = int(nearest(getattr(snapshot.coord[dim], 'value', snapshot.coord[dim]), x))
+      self._regridders[key] = Regridder(snapshot.geometry, snapshot.coord, snapshot.grids.axes, \
+          resolution, extent, method, fixed)
+    return self._regridders[key]
+
+
+  def _slice(self, index):
+    ''' slice outputs by number of output files (int) or by time (float) '''
+
+    if isinstance(index.start, float) or isinstance(index.stop, float):
+      t0 = -np.inf if index.start is None else index.start
+      t1 = np.inf if index.stop is None else index.stop
+      return self.between(t0, t1)[::index.step]
+
+    self._log.refresh()
+    nfile = self._log.nfile
+    existed = set(nfile.tolist())
+    numbers = [ns for ns in range(nfile[-1]+1)[index] if ns in existed]
+    return self.series(numbers)
+
+
   def info(self):
     for attr in self.__slots__:
       if hasattr(self, attr):
         print(f'{attr:15}:  {getattr(self, attr)}')
 
 
+  @staticmethod
+  def _known_derived_fields():
+    derived_fields = []
+    for k, v in PlutoFluidInfo.known_fields.items():
+      if v[0] is not None:
+        derived_fields.append(k)
+    return derived_fields
+
+
+  def _read_grid(self):
+    ''' read grid.out once, the results are shared by all snapshots
+
+    Returns:
+      tuple: (index, coord), copies of the dicts so that snapshots can reassign their items
+    '''
+
+    if self._grid_info is None:
+      if self.datatype == StoreReader.datatype:
+        self._grid_info = read_store_grid(self.output_dir+'store/')
+      else:
+        self._grid_info = read_grid(self.output_dir)
+    index, coord = self._grid_info
+    return dict(index), dict(coord)
+
+
   def _number_step(self, ns):
     ''' find number step of data file
 
@@ -151,20 +532,73 @@ class Dataset(object):
           it is assumed to be time, and return the nearst number step
     '''
 
-    hdr = ['nfile','time','dt','Nstep']
-    log_file = pd.read_table(self.output_dir+self.datatype+'.out',sep=' ', usecols=[0,1,2,3], names=hdr, index_col=0)
+    self._log.refresh()  # only reads the lines appended since last call
 
     if type(ns) is int:
       if ns < 0:
-        return log_file.index[-1]
+        return self._log.last()
       else:
         return ns
     elif type(ns) is float:     #  given a specific [time], find [ns] corresponding nearst existed data [time].
-      return nearest(log_file['time'],ns)
+      return self._log.nearest(ns)
     else:
       raise TypeError(f'ns({ns}) should be int or float, now it is {type(ns)}.')
 
 
+_worker_datasets = {}
+
+def _map_worker(task):
+  ''' open a snapshot in a worker process of Dataset.map() and apply the function to it '''
+
+  args, func, index = task
+  if args not in _worker_datasets:  # parse the metadata once per process
+    _worker_datasets[args] = Dataset(*args)
+  return func(_worker_datasets[args][index])
+
+
+def _phase_histogram(xfield, yfield, edges, weight, kwargs, snapshot):
+  ''' histogram of a snapshot in Dataset.phase() '''
+
+  return snapshot.phase(xfield, yfield, edges, weight, **kwargs)[0]
+
+
+def _axis_pair(value):
+  ''' split a phase() argument into those of two dimensions, like numpy.histogram2d
+
+  Args:
+    value: a list or tuple of length 2 for each dimension, or a value (e.g. a 1-D array of bin edges) for both
+
+  Returns:
+    tuple: values of the two dimensions
+  '''
+
+  if isinstance(value, (list, tuple)) and len(value) == 2:
+    return tuple(value)
+  return value, value
+
+
+def _histogram_edges(bins, log=False, range=None):
+  ''' bin edges from the number of bins and the range, or the given edges, without reading data
+
+  Args:
+    bins (int/array): number of bins or bin edges
+    log (bool): whether bins are evenly spaced in log scale
+    range (tuple): (min, max), required unless bin edges are given
+
+  Returns:
+    numpy.ndarray: bin edges
+  '''
+
+  if np.ndim(bins) == 1:
+    return np.asarray(bins, dtype=float)
+  if range is None:
+    raise ValueError('The range is required to compute bin edges from the number of bins.')
+  range = tuple(getattr(r, 'value', r) for r in range)
+  if log:
+    return np.logspace(np.log10(range[0]), np.log10(range[1]), bins+1)
+  return np.linspace(range[0], range[1], bins+1)
+
+
 class Snapshot(Dataset):
   ''' Pluto output snapshot data structure
 
@@ -172,6 +606,8 @@ class Snapshot(Dataset):
     ns (int/float): the index of snapshot. It should be a integer in default, \
         but if it is a negative integer, return the last snapshot. \
         Or if it is a float, it is assumed to be the time, and return the nearst snapshot
+    dataset (Dataset): if given, the metadata already parsed by it are reused, \
+        instead of reading the init file, log file and definitions.h again. (optional)
     Other arguements refer to Dataset() class
 
   Attributes:
@@ -192,6 +628,17 @@ class Snapshot(Dataset):
     slice2d(field, x1=None, x2=None, x3=None):
     slice1d(field, x1=None, x2=None, x3=None):
     to_cart(field):
+    cartesian(vectors=None):
+    regrid(field, resolution=512, extent=None, method='nearest', x1=None, x2=None, x3=None):
+    blockwise(func, allocate=None):
+    sum(field=None, weight='dV', mask=None, region=None, chunk=None):
+    mean(field, weight='dV', mask=None, region=None, chunk=None):
+    min(field, mask=None, region=None, chunk=None):
+    max(field, mask=None, region=None, chunk=None):
+    total_mass(mask=None, region=None, chunk=None):
+    total_energy(gamma=5/3, mask=None, region=None, chunk=None):
+    profile(field, bin_field='x1', bins=64, weight='dV', log=False, range=None, mask=None, region=None, chunk=None):
+    phase(xfield, yfield, bins=64, weight='dV', log=False, range=None, mask=None, region=None, chunk=None):
   '''
 
   __slots__= Dataset.__slots__ + [
@@ -204,41 +651,62 @@ class Snapshot(Dataset):
     'fields'
   ]
 
-  def __init__(self, ns, code_dir, datatype,init_file, with_units):
-    super().__init__(code_dir, datatype, init_file, with_units)
+  def __init__(self, ns, code_dir='./', datatype='dbl', init_file='pluto.ini', with_units=False, lazy=False, dataset=None, cache_budget=None, disk_cache=False, \
+      block_cells=2**22, block_axis=None):
+    if dataset is None:
+      super().__init__(code_dir, datatype, init_file, with_units, lazy, cache_budget, disk_cache, block_cells, block_axis)
+    else:
+      if dataset.datatype in _readers:
+        dataset._read_grid()  # make sure grid.out is read only once by the parent dataset
+      for attr in ['code_dir', 'output_dir', 'init_file', 'datatype', 'filetype', 'endianess', \
+          'geometry', 'ndim', 'code_unit', 'field_list', 'disk_cache', 'block_cells', 'block_axis', '_grid_info', '_trig', '_regridders', '_log']:
+        setattr(self, attr, getattr(dataset, attr))
+      self.derived_fields = self._known_derived_fields()
+      self.lazy = lazy
+      self.cache_budget = cache_budget
 
-    ds = pp.pload(ns, w_dir=self.output_dir, datatype=self.datatype)
-    self.nstep = ds.NStep
-    self.time = ds.SimTime
-    self.dt = ds.Dt
+    self.nstep = ns
     self.with_units = False
 
-    # initialize Snapshot.index
-    grids_info = [
-      'n1','n2','n3',         # number of computational cells
-      'n1_tot','n2_tot','n3_tot',   # total cells including ghost cells
-    ]
-    self.index = {}
-    for key in grids_info:
-      self.index[key] = getattr(ds, key)
-
-    # initialize Snapshot.coord
-    coord_info = [
-      'x1','x2','x3',   # cell center coordinate
-      'dx1','dx2','dx3',  # cell width
-      'x1r','x2r','x3r'  # cell edge coordinate
-    ]
-    self.coord = {}
-    for key in coord_info:
-      self.coord[key] = getattr(ds, key)
+    if self.datatype in _readers:
+      # read grid and time information natively, the data are memory-mapped (or read by chunks of a store)
+      self.index, self.coord = self._read_grid()
+      self.time, self.dt = self._log.info(ns)
+      data = _readers[self.datatype](ns, self, self.index)
+    else:
+      data = PloadReader(ns, self)
+      ds = data.data
+      self.time = ds.SimTime
+      self.dt = ds.Dt
+
+      # initialize Snapshot.index
+      grids_info = [
+        'n1','n2','n3',         # number of computational cells
+        'n1_tot','n2_tot','n3_tot',   # total cells including ghost cells
+      ]
+      self.index = {}
+      for key in grids_info:
+        self.index[key] = getattr(ds, key)
+
+      # initialize Snapshot.coord
+      coord_info = [
+        'x1','x2','x3',   # cell center coordinate
+        'dx1','dx2','dx3',  # cell width
+        'x1r','x2r','x3r'  # cell edge coordinate
+      ]
+      self.coord = {}
+      for key in coord_info:
+        self.coord[key] = getattr(ds, key)
 
     # initialize Snapshot.grids
     self.grids = Grid(self)
 
     # initialize Snapshot.field
-    self.fields = Field(self, ds)
+    self.fields = Field(self, data, lazy=lazy, cache_budget=cache_budget, disk_cache=self.disk_cache)
 
-    if with_units:
+    if with_units == 'metadata':
+      self.in_astro_unit(metadata=True)
+    elif with_units:
       self.in_astro_unit()
       self.with_units = with_units
 
@@ -252,8 +720,18 @@ class Snapshot(Dataset):
           print(f'{attr:15}:  {value}')
 
 
-  def in_code_unit(self):
-    ''' Assign code units '''
+  def in_code_unit(self, metadata=False):
+    ''' Assign code units
+
+    Args:
+      metadata (bool): if True, arrays are not converted to units.Quantity. \
+          They stay as raw arrays and the units are only recorded, \
+          which can be obtained by `fields.unit()`, `fields.quantity()`, `grids.unit()`, etc. Default is False.
+    '''
+
+    if metadata:
+      self._metadata_units('code')
+      return
 
     code_length = self.code_unit['code_length']
     code_density = self.code_unit['code_density']
@@ -285,8 +763,18 @@ class Snapshot(Dataset):
       self.with_units = True
 
 
-  def in_astro_unit(self):
-    ''' convert the units to those commonly used in astro '''
+  def in_astro_unit(self, metadata=False):
+    ''' convert the units to those commonly used in astro
+
+    Args:
+      metadata (bool): if True, arrays are not converted. They stay as raw arrays in code units, \
+          the conversion factors are applied only by consumers, \
+          e.g. `fields.quantity()`, reductions and profiles. Default is False.
+    '''
+
+    if metadata:
+      self._metadata_units('astro')
+      return
 
     if not self.with_units:  # in case not quantity, assign code_unit first
       self.in_code_unit()
@@ -305,6 +793,15 @@ class Snapshot(Dataset):
     self.dt = self.dt.to(u.yr)
 
 
+  def _metadata_units(self, unit_system):
+    ''' record the unit system without converting arrays '''
+
+    if self.with_units:
+      raise ValueError('Arrays already carry units, units can be kept as metadata only for raw arrays.')
+    self.grids.unit_system = unit_system
+    self.fields.unit_system = unit_system
+
+
   def slice2d(self, type, field, x1=None, x2=None, x3=None):
     ''' Slice 3-D array and return 2-D array
 
@@ -333,8 +830,8 @@ class Snapshot(Dataset):
         offset[i] = nearest(x, coord)  # convert coord to index
         break
       i+=1
-    index = str(offset).replace('None',':')
-    arr = eval(f'self.{type}["{field}"]{index}')
+    index = tuple(slice(None) if i is None else i for i in offset)
+    arr = self._region(type, field, index)
     return arr
 
 
@@ -372,6 +869,381 @@ class Snapshot(Dataset):
       else:
         offset[i] = None
       i+=1
-    index = str(offset).replace('None',':')
-    arr = eval(f'self.{type}["{field}"]{index}')
+    index = tuple(slice(None) if i is None else i for i in offset)
+    arr = self._region(type, field, index)
     return arr
+
+
+  def regrid(self, field, resolution=512, extent=None, method='nearest', x1=None, x2=None, x3=None):
+    ''' resample a field onto a uniform cartesian grid
+
+    Args:
+      field (str): field name
+      Other arguments refer to Dataset.regridder()
+
+    Returns:
+      numpy.ndarray: resampled array, pixels outside the data are NaN. \
+          The coordinates of pixels are in `regridder(...).coords`.
+    '''
+
+    return self.regridder(resolution, extent, method, x1, x2, x3)(self, field)
+
+
+  def cartesian(self, vectors=None):
+    ''' cartesian view of the snapshot, which is not changed
+
+    Args:
+      vectors (list): triples of names of vector fields to be transformed, e.g. [('vx1', 'vx2', 'vx3')]. \
+          Default is None, velocity and magnetic field if they are in `field_list`.
+
+    Returns:
+      CartesianView: refer to CartesianView
+    '''
+
+    return CartesianView(self, vectors)
+
+
+  def _region(self, type, field, index):
+    ''' index an array of grids or fields, only the region of fields not cached is read '''
+
+    if type == 'fields':
+      return self.fields.region(field, index)
+    else:
+      return getattr(self, type)[field][index]
+
+
+  def _axes(self):
+    ''' names of coordinates corresponding to the axes of field arrays '''
+
+    if self.ndim == 3:
+      return ['x1', 'x2', 'x3']
+    return ['x'+str(i+1) for i in range(3) if self.index['n'+str(i+1)] != 1]
+
+
+  def _block_axis(self):
+    ''' axis of field arrays along which blocks are split '''
+
+    axes = self._axes()
+    return axes.index(self.block_axis) if self.block_axis in axes else len(axes) - 1
+
+
+  def _blocks(self, region=None, chunk=None):
+    ''' generate index tuples of blocks (slabs along `block_axis`) covering a region
+
+    Args:
+      region (dict): ranges of coordinates, e.g. {'x1': (0.1, 0.5)}. Default is None, the whole domain.
+      chunk (int): number of cells along `block_axis` in a block. \
+          Default is None, determined by `block_cells`.
+    '''
+
+    index = []
+    for dim in self._axes():
+      x = self.coord[dim].value if self.with_units else self.coord[dim]
+      if region is not None and dim in region:
+        lo, hi = region[dim]
+        index.append(slice(int(np.searchsorted(x, lo, 'left')), int(np.searchsorted(x, hi, 'right'))))
+      else:
+        index.append(slice(0, len(x)))
+
+    shape = tuple(i.stop for i in index)
+    return slabs(shape, self._block_axis(), self.block_cells, tuple(index), chunk)
+
+
+  def blockwise(self, func, allocate=None):
+    ''' evaluate a function over the domain block by block, only the output is allocated in full size
+
+    Args:
+      func (callable): function taking the index of a block and returning the values in it, \
+          or a tuple of values for several outputs
+      allocate (callable): function taking shape and dtype and returning the array to be filled, \
+          e.g. `numpy.lib.format.open_memmap` for outputs larger than memory. (optional)
+
+    Returns:
+      numpy.ndarray/units.Quantity: in the shape of fields, or a tuple of them
+    '''
+
+    return evaluate(func, self.grids.shape(), self._block_axis(), self.block_cells, allocate)
+
+
+  def _block_values(self, field, index):
+    ''' values of a field in a block
+
+    Args:
+      field (str/callable): field name, or a function taking the index of a block and returning the values in it
+      index (tuple): index of the block
+    '''
+
+    if callable(field):
+      return field(index)
+    elif field in ['x1', 'x2', 'x3', 'dV']:
+      values = self.grids.block(field, index)
+    elif field == 'mass':
+      values = self.fields.region('rho', index) * self.grids.block('dV', index)
+    else:
+      values = self.fields.region(field, index)
+
+    # units kept as metadata, the conversion is fused into the block
+    scale = self._scale(field)
+    return values if scale == 1 else values * scale
+
+
+  def _scale(self, field):
+    ''' factor converting raw values of a field to the unit system recorded as metadata '''
+
+    if field is None or callable(field):
+      return 1.0
+    elif field in ['x1', 'x2', 'x3', 'dV']:
+      return self.grids.scale(field)
+    elif field == 'mass':
+      return self.fields.scale('rho') * self.grids.scale('dV')
+    else:
+      return self.fields.scale(field)
+
+
+  def _attach_units(self, value, *fields):
+    ''' attach units recorded as metadata to the result of a reduction '''
+
+    if value is None or self.with_units or self.fields.unit_system is None:
+      return value
+    unit = u.dimensionless_unscaled
+    for field in fields:
+      if field is None or callable(field):
+        continue
+      elif field in ['x1', 'x2', 'x3', 'dV']:
+        unit = unit * self.grids.unit(field)
+      elif field == 'mass':
+        unit = unit * self.fields.unit('rho') * self.grids.unit('dV')
+      else:
+        unit = unit * self.fields.unit(field)
+    return value * unit
+
+
+  def _reduce(self, op, field, weight=None, mask=None, region=None, chunk=None):
+    ''' reduce a field block by block, so that no full-size temporary array is needed '''
+
+    result = None
+    for index in self._blocks(region, chunk):
+      values = None if field is None else self._block_values(field, index)
+      w = None if weight is None else self._block_values(weight, index)
+      if mask is not None:
+        m = mask[index]
+        values = None if values is None else values[m]
+        w = None if w is None else w[m]
+      value = op(values, w)
+      if value is None:
+        continue
+      if result is None:
+        result = value
+      elif op is self._op_min:
+        result = np.minimum(result, value)
+      elif op is self._op_max:
+        result = np.maximum(result, value)
+      else:
+        result = result + value
+    return result
+
+  @staticmethod
+  def _op_sum(values, weight):
+    if values is None:
+      return np.sum(weight)
+    if weight is None:
+      return np.sum(values)
+    return np.sum(values*weight)
+
+  @staticmethod
+  def _op_min(values, weight):
+    return np.min(values) if values.size > 0 else None
+
+  @staticmethod
+  def _op_max(values, weight):
+    return np.max(values) if values.size > 0 else None
+
+
+  def sum(self, field=None, weight='dV', mask=None, region=None, chunk=None):
+    ''' sum of a field weighted by volume (i.e. volume integral) or other weights, block by block
+
+    Args:
+      field (str/callable): field name, or a function taking the index of a block and returning the values in it. \
+          Default is None, sum of weight (e.g. total volume).
+      weight (str): 'dV' (volume), 'mass', any field name, or None (no weight). Default is 'dV'.
+      mask (numpy.ndarray): boolean array in the shape of fields, only cells where it is True are included. (optional)
+      region (dict): ranges of coordinates, e.g. {'x1': (0.1, 0.5)}. (optional)
+      chunk (int): number of cells along the last axis in a block. (optional)
+
+    Returns:
+      float/units.Quantity
+    '''
+
+    return self._attach_units(self._reduce(self._op_sum, field, weight, mask, region, chunk), field, weight)
+
+
+  def mean(self, field, weight='dV', mask=None, region=None, chunk=None):
+    ''' weighted mean of a field, volume-weighted in default
+
+    Args refer to sum()
+    '''
+
+    if weight is None:
+      return self.sum(field, None, mask, region, chunk) / self._reduce(self._op_count, field, None, mask, region, chunk)
+    return self.sum(field, weight, mask, region, chunk) / self.sum(None, weight, mask, region, chunk)
+
+  @staticmethod
+  def _op_count(values, weight):
+    return values.size
+
+
+  def min(self, field, mask=None, region=None, chunk=None):
+    ''' minimum of a field, Args refer to sum() '''
+
+    return self._attach_units(self._reduce(self._op_min, field, None, mask, region, chunk), field)
+
+
+  def max(self, field, mask=None, region=None, chunk=None):
+    ''' maximum of a field, Args refer to sum() '''
+
+    return self._attach_units(self._reduce(self._op_max, field, None, mask, region, chunk), field)
+
+
+  def total_mass(self, mask=None, region=None, chunk=None):
+    ''' total mass, i.e. volume integral of density. Args refer to sum() '''
+
+    return self.sum('rho', 'dV', mask, region, chunk)
+
+
+  def total_energy(self, gamma=5/3, mask=None, region=None, chunk=None):
+    ''' total energy, i.e. volume integral of kinetic and thermal energy density
+
+    Args:
+      gamma (float): adiabatic index of the ideal gas. Default is 5/3.
+      Other arguments refer to sum()
+    '''
+
+    velocities = [v for v in ['vx1', 'vx2', 'vx3'] if v in self.field_list]
+
+    def energy_density(index):
+      rho = self.fields.region('rho', index)
+      ek = sum(self.fields.region(v, index)**2 for v in velocities) * rho * 0.5
+      return (ek + self.fields.region('prs', index) / (gamma - 1)) * self._scale('prs')
+
+    energy = self._reduce(self._op_sum, energy_density, 'dV', mask, region, chunk)
+    return self._attach_units(energy, 'prs', 'dV')
+
+
+  def _bin_edges(self, bin_field, bins, log=False, range=None, mask=None, region=None, chunk=None):
+    ''' bin edges in the format of numpy.histogram_bin_edges '''
+
+    if range is None and np.ndim(bins) == 0:
+      if bin_field in ['x1', 'x2', 'x3'] and region is None and mask is None:
+        x = self.coord[bin_field].value if self.with_units else self.coord[bin_field] * self.grids.scale(bin_field)
+        range = (np.min(x), np.max(x))
+      else:
+        range = (self.min(bin_field, mask, region, chunk), self.max(bin_field, mask, region, chunk))
+    return _histogram_edges(bins, log, range)
+
+  @staticmethod
+  def _digitize(x, edges):
+    ''' bin index of values, the right edge is included in the last bin, -1 for values out of range '''
+
+    nbins = len(edges) - 1
+    i = np.searchsorted(edges, x, side='right') - 1
+    i[x == edges[-1]] = nbins - 1
+    i[(i < 0) | (i >= nbins)] = -1
+    return i
+
+
+  def profile(self, field, bin_field='x1', bins=64, weight='dV', log=False, range=None, mask=None, region=None, chunk=None):
+    ''' weighted average profile of a field binned by a coordinate or another field
+
+    Args:
+      field (str/callable): field to be averaged, refer to sum()
+      bin_field (str): coordinate (x1, x2, x3) or field name by which cells are binned. Default is 'x1'.
+      bins (int/array_like): number of bins, or bin edges. Default is 64.
+      weight (str): 'dV' (volume), 'mass', any field name, or None (no weight). Default is 'dV'.
+      log (bool): whether bins are evenly spaced in log scale. Default is False.
+      range (tuple): lower and upper edges of bins. Default is None, the range of `bin_field`.
+      Other arguments refer to sum()
+
+    Returns:
+      tuple: (bin edges, profile), bins without any cell are NaN in the profile
+    '''
+
+    edges = self._bin_edges(bin_field, bins, log, range, mask, region, chunk)
+    nbins = len(edges) - 1
+    total = np.zeros(nbins)
+    norm = np.zeros(nbins)
+    unit = None
+    for index in self._blocks(region, chunk):
+      values = self._block_values(field, index)
+      x = self._block_values(bin_field, index)
+      w = None if weight is None else self._block_values(weight, index)
+      if unit is None:
+        unit = getattr(values, 'unit', None)
+      values = getattr(values, 'value', values)
+      x = getattr(x, 'value', x)
+      w = np.ones(np.shape(values)) if w is None else getattr(w, 'value', w)
+      values, x, w = np.broadcast_arrays(values, x, w)
+      if mask is not None:
+        m = mask[index]
+        values, x, w = values[m], x[m], w[m]
+      i = self._digitize(np.ravel(x), edges)
+      valid = i >= 0
+      i = i[valid]
+      w = np.ravel(w)[valid]
+      total += np.bincount(i, weights=np.ravel(values)[valid]*w, minlength=nbins)
+      norm += np.bincount(i, weights=w, minlength=nbins)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+      prof = np.where(norm > 0, total / norm, np.nan)
+    if unit is not None:
+      prof = prof * unit
+    return edges, self._attach_units(prof, field)
+
+
+  def _phase_edges(self, xfield, yfield, bins=64, log=False, range=None, mask=None, region=None, chunk=None):
+    ''' bin edges of two dimensions for phase() '''
+
+    bins, log = _axis_pair(bins), _axis_pair(log)
+    range = (None, None) if range is None else range
+    xedges = self._bin_edges(xfield, bins[0], log[0], range[0], mask, region, chunk)
+    yedges = self._bin_edges(yfield, bins[1], log[1], range[1], mask, region, chunk)
+    return xedges, yedges
+
+
+  def phase(self, xfield, yfield, bins=64, weight='dV', log=False, range=None, mask=None, region=None, chunk=None):
+    ''' phase diagram, i.e. 2-D histogram of two fields weighted by volume, mass or other fields
+
+    Args:
+      xfield (str/callable): field along the first dimension of the histogram
+      yfield (str/callable): field along the second dimension of the histogram
+      bins (int/array/tuple): number of bins or bin edges shared by both dimensions, \
+          or a pair of them for each dimension. Default is 64.
+      weight (str): 'dV' (volume), 'mass', any field name, or None (cell counts). Default is 'dV'.
+      log (bool/tuple): whether bins are evenly spaced in log scale, for both or each dimension. Default is False.
+      range (tuple): ((xmin, xmax), (ymin, ymax)). Default is None, the ranges of fields.
+      Other arguments refer to sum()
+
+    Returns:
+      tuple: (histogram, x edges, y edges), histogram is in the shape of (x bins, y bins)
+    '''
+
+    xedges, yedges = self._phase_edges(xfield, yfield, bins, log, range, mask, region, chunk)
+    nx = len(xedges) - 1
+    ny = len(yedges) - 1
+    hist = np.zeros(nx*ny)
+    for index in self._blocks(region, chunk):
+      x = self._block_values(xfield, index)
+      y = self._block_values(yfield, index)
+      w = None if weight is None else self._block_values(weight, index)
+      x = getattr(x, 'value', x)
+      y = getattr(y, 'value', y)
+      w = np.ones(np.shape(x)) if w is None else getattr(w, 'value', w)
+      x, y, w = np.broadcast_arrays(x, y, w)
+      if mask is not None:
+        m = mask[index]
+        x, y, w = x[m], y[m], w[m]
+      i = self._digitize(np.ravel(x), xedges)
+      j = self._digitize(np.ravel(y), yedges)
+      valid = (i >= 0) & (j >= 0)
+      hist += np.bincount(i[valid]*ny + j[valid], weights=np.ravel(w)[valid], minlength=nx*ny)
+
+    return hist.reshape(nx, ny), xedges, yedges
@@ -0,0 +1,181 @@
+import ast
+import numpy as np
+import astropy.units as u
+
+from .grid import Grid
+
+try:
+  import numexpr
+except ImportError:
+  numexpr = None
+
+
+class Expression(object):
+  ''' Derived field defined by an arithmetic expression of fields and grid quantities, e.g. 'sqrt(vx1*vx1 + vx2*vx2)'
+
+  Args:
+    expression (str): arithmetic expression, of the functions in `Expression.functions`
+
+  Attributes:
+    names (list): names of inputs in the expression
+    fields (list): names of fields in the expression, i.e. inputs which are not grid quantities
+
+  Methods:
+    evaluate(arrays):
+  '''
+
+  functions = {
+    'sqrt': np.sqrt,
+    'exp': np.exp,
+    'log': np.log,
+    'log10': np.log10,
+    'sin': np.sin,
+    'cos': np.cos,
+    'tan': np.tan,
+    'arcsin': np.arcsin,
+    'arccos': np.arccos,
+    'arctan': np.arctan,
+    'arctan2': np.arctan2,
+    'sinh': np.sinh,
+    'cosh': np.cosh,
+    'tanh': np.tanh,
+    'abs': np.absolute,
+  }
+
+  operators = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: np.true_divide,
+    ast.Pow: np.power,
+  }
+
+  # number of cells evaluated at a time by numpy, 32768 float64 cells (256 kB) per intermediate array
+  block_cells = 2**15
+
+  # whether to evaluate with numexpr when it is installed
+  use_numexpr = numexpr is not None
+
+  __slots__ = [
+    'expression',
+    'names',
+    'fields',
+    '_tree',
+    '_code'
+  ]
+
+  def __init__(self, expression):
+    self.expression = expression
+    self._tree = ast.parse(expression.strip(), mode='eval')
+    self.names = []
+    for node in ast.walk(self._tree):
+      self._check(node)
+    for node in sorted((node for node in ast.walk(self._tree) if isinstance(node, ast.Name)), key=lambda node: node.col_offset):
+      if node.id not in self.functions and node.id not in self.names:
+        self.names.append(node.id)
+    self.fields = [name for name in self.names if name not in Grid.coord_keys + Grid.geometry_keys]
+    self._code = compile(self._tree, '<expression>', 'eval')
+
+  def __repr__(self):
+    return f"Expression('{self.expression}')"
+
+  def _check(self, node):
+    allowed = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Call, ast.Name, ast.Load, ast.USub, ast.UAdd) \
+        + tuple(self.operators)
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+      return
+    if isinstance(node, ast.Call) and not (isinstance(node.func, ast.Name) and node.func.id in self.functions):
+      raise ValueError(f'Unsupported function in expression {self.expression!r}, '
+          f'only {list(self.functions)} are available.')
+    if not isinstance(node, allowed):
+      raise ValueError(f'Unsupported syntax {type(node).__name__} in expression {self.expression!r}.')
+
+  def __call__(self, data):
+    ''' evaluate the expression with the fields and grids of a snapshot '''
+
+    arrays = {}
+    for name in self.names:
+      arrays[name] = data.fields[name] if name in self.fields else data.grids[name]
+
+    units = {name: arr.unit for name, arr in arrays.items() if hasattr(arr, 'unit')}
+    if len(units) == 0:
+      return self.evaluate(arrays)
+
+    unit = self._unit(units)
+    if unit is None:
+      # units are not consistent (e.g. km/s + cm/s), leave the conversion to astropy
+      return eval(self._code, {'__builtins__': {}}, {**self.functions, **arrays})
+    values = {name: getattr(arr, 'value', arr) for name, arr in arrays.items()}
+    return u.Quantity(self.evaluate(values), unit, copy=False)
+
+  def _unit(self, units):
+    ''' unit of the result, None if evaluating the numbers alone does not give the right result '''
+
+    env = {'__builtins__': {}}
+    quantity = eval(self._code, env, {**self.functions, **{name: 1.0*units.get(name, 1) for name in self.names}})
+    number = eval(self._code, env, {**self.functions, **{name: 1.0 for name in self.names}})
+    if not np.isclose(getattr(quantity, 'value', quantity), number):
+      return None
+    return getattr(quantity, 'unit', u.dimensionless_unscaled)
+
+  def evaluate(self, arrays):
+    ''' evaluate the expression
+
+    Args:
+      arrays (dict): numpy arrays of all inputs in `names`, they are broadcast against each other
+
+    Returns:
+      numpy.ndarray: the result
+    '''
+
+    if self.use_numexpr:
+      return numexpr.evaluate(self.expression, local_dict=arrays)
+
+    inputs = [np.asanyarray(arrays[name]) for name in self.names]
+    dtype = np.result_type(*inputs, np.float32).newbyteorder('=')
+    it = np.nditer(inputs + [None], \
+        flags=['external_loop', 'buffered', 'zerosize_ok'], \
+        op_flags=[['readonly']]*len(inputs) + [['writeonly', 'allocate']], \
+        op_dtypes=[None]*len(inputs) + [dtype], \
+        order='K', buffersize=self.block_cells)
+    with it:
+      for blocks in it:
+        block = dict(zip(self.names, blocks[:-1]))
+        value, _ = self._block(self._tree.body, block)
+        blocks[-1][...] = value
+      return it.operands[-1]
+
+  def _block(self, node, block):
+    ''' evaluate a node on a block, reusing intermediate arrays as outputs
+
+    Returns:
+      tuple: (value, whether the value is an intermediate array which can be overwritten)
+    '''
+
+    if isinstance(node, ast.Constant):
+      return node.value, False
+    if isinstance(node, ast.Name):
+      return block[node.id], False
+    if isinstance(node, ast.UnaryOp):
+      value, temp = self._block(node.operand, block)
+      if isinstance(node.op, ast.UAdd) or np.isscalar(value):
+        return (value if isinstance(node.op, ast.UAdd) else -value), temp
+      return np.negative(value, out=value if temp else None), True
+
+    if isinstance(node, ast.BinOp):
+      args = [self._block(node.left, block), self._block(node.right, block)]
+      op = self.operators[type(node.op)]
+      if op is np.power and isinstance(node.right, ast.Constant) and node.right.value == 2:
+        op, args[1] = np.multiply, args[0]
+    else:
+      args = [self._block(arg, block) for arg in node.args]
+      op = self.functions[node.func.id]
+
+    out = None
+    for value, temp in args:
+      if temp:
+        out = value
+        break
+    if out is None and all(np.isscalar(value) for value, _ in args):
+      return op(*[value for value, _ in args]), False
+    return op(*[value for value, _ in args], out=out), True
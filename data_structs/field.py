@@ -2,95 +2,391 @@ import numpy as np
 import astropy.units as u
 
 from ..pluto_fluid_info import PlutoFluidInfo
+from .reader import is_mapped
+from .cache import FieldCache
+from .blocks import BlockView
 
 
 class Field(object):
-  ''' Contain the information of fields '''
+  ''' Contain the information of fields
+
+  Args:
+    snapshot (Snapshot): the snapshot these fields belong to
+    data (Reader/PloadReader): reader of the output file
+    lazy (bool): if True, a primal field is read from disk only on its first access. Default is False.
+    cache_budget (int): memory budget of cached arrays in bytes, \
+        the least recently used fields are evicted when it is exceeded. Default is None, no limit.
+    disk_cache (DiskCache): persistent cache of derived fields. Default is None, not used.
+  '''
 
   __slots__ = [
     'snapshot',
+    'reader',
+    'lazy',
+    'unit_system',
     'primal_fields',
     'derived_fields',
-    'cache_list',
+    'disk_cache',
     '_cache'
   ]
 
-  def __init__(self, snapshot, data):
+  def __init__(self, snapshot, data, lazy=False, cache_budget=None, disk_cache=None):
     self.snapshot = snapshot
+    self.reader = data
+    self.lazy = lazy
+    self.unit_system = None   # None (dimensionless), 'code' or 'astro'
     self.primal_fields = snapshot.field_list
     self.derived_fields = snapshot.derived_fields
-    self._cache = {}
-    for name in self.primal_fields:
-      self._cache[name] = getattr(data, name)
-    self.cache_list = self.primal_fields
+    self._cache = FieldCache(cache_budget)
+    self.disk_cache = disk_cache
+    if not lazy:
+      for name in self.primal_fields:
+        self._load(name)
 
   def __getitem__(self, name):
-    if name in self.cache_list:
+    if name in self._cache:
+      self._cache.hits += 1
       return self._cache[name]
+    elif name in self.primal_fields:
+      self._cache.misses += 1
+      return self._load(name)
     elif name in self.derived_fields:
-      f = PlutoFluidInfo.function(name)
-      self.cache_list.append(name)
-      self._cache[name] = f(self.snapshot)
-      return self._cache[name]
+      self._cache.misses += 1
+      value = self._compute(name)
+      self._cache[name] = value
+      return value
     else:
       raise KeyError(f'The field {name} cannot be found in PlutoFluidInfo. Check the name or add by yourself.')
 
   def __setitem__(self, name, value):
-    self._cache[name] = value
+    self._cache.put(name, value, fixed=True)   # never evicted, since it cannot be restored
+    # derived fields computed from the old value are recomputed on next access
+    for key in self._affected([name]):
+      self.remove(key)
+
+  def _compute(self, name):
+    ''' compute a derived field, or memory-map it from the disk cache unless any field is assigned by users '''
+
+    f = PlutoFluidInfo.function(name)
+    unit = self.unit(name)
+    key = None
+    if self.disk_cache is not None and not self._cache.fixed:
+      code_unit = [str(v.decompose()) for v in self.snapshot.code_unit.values()]
+      units = (self.unit_system, bool(self.snapshot.with_units), str(unit), code_unit)
+      order = PlutoFluidInfo.plan([name])
+      derived = [dep for dep in order if dep not in self.primal_fields]
+      if any(PlutoFluidInfo.depends(dep) is None for dep in derived):
+        inputs = self.primal_fields  # undeclared inputs may be any output
+      else:
+        inputs = [dep for dep in order if dep in self.primal_fields]
+      sources = sorted({self.reader.filename(dep) for dep in inputs}) if hasattr(self.reader, 'filename') else []
+      functions = [PlutoFluidInfo.function(dep) for dep in reversed(derived)]
+      key = self.disk_cache.key(name, self.snapshot.nstep, functions, units, sources)
+      value = self.disk_cache.load(key)
+      if value is not None:
+        if self.snapshot.with_units and unit is not None:
+          value = u.Quantity(value, unit, copy=False)
+        return value
+
+    if PlutoFluidInfo.is_blockwise(name):
+      # no full-size temporary array, and the output is written to the disk cache directly if it is used
+      allocate = None if key is None else (lambda shape, dtype: self.disk_cache.create(key, shape, dtype))
+      value = self.snapshot.blockwise(lambda index: self._compute_block(name, index), allocate)
+      if key is not None:
+        self.disk_cache.commit(key)
+        value = self.disk_cache.load(key) if not hasattr(value, 'unit') else \
+            u.Quantity(self.disk_cache.load(key), value.unit, copy=False)
+      return value
+
+    value = f(self.snapshot)
+    if self.snapshot.with_units and unit is not None and hasattr(value, 'unit'):
+      value = value.to(unit)
+    if key is not None and (unit is not None or not hasattr(value, 'unit')):
+      self.disk_cache.save(key, getattr(value, 'value', value))
+    return value
+
+  def _compute_block(self, name, index):
+    ''' compute a derived field in a block, only the inputs in the block are read or computed '''
+
+    value = PlutoFluidInfo.function(name)(BlockView(self.snapshot, index))
+    unit = self.unit(name)
+    if self.snapshot.with_units and unit is not None and hasattr(value, 'unit'):
+      value = value.to(unit)
+    return value
+
+  def _load(self, name):
+    ''' read a primal field from disk and assign the current units '''
+
+    arr = self._assign_units(name, self.reader.read(name))
+    self._cache[name] = arr
+    return arr
+
+  @property
+  def cache_list(self):
+    ''' names of cached fields, from the least to the most recently used '''
+
+    return list(self._cache)
+
+  @property
+  def stats(self):
+    ''' statistics of the cache, refer to FieldCache.stats() '''
+
+    return self._cache.stats()
+
+  def pin(self, *names):
+    ''' keep fields in the cache regardless of the memory budget, they are read or computed if not cached '''
+
+    for name in names:
+      self[name]
+      self._cache.pin(name)
+
+  def unpin(self, *names):
+    for name in names:
+      self._cache.unpin(name)
+
+  def _assign_units(self, name, arr):
+    ''' assign the current units to an array of primal field read from disk '''
+
+    if self.snapshot.with_units and self.unit_system is not None:
+      unit = self.unit(name)
+      factor = u.Unit(PlutoFluidInfo.code_unit(name)).to(unit)
+      if np.shape(arr) == self.snapshot.grids.shape():
+        arr = self.snapshot.blockwise(lambda index: arr[index] * factor)  # without full-size temporary arrays
+      else:
+        arr = arr * factor
+      arr = u.Quantity(arr, unit, copy=False)
+    return arr
+
+  def region(self, name, index):
+    ''' return a region (hyperslab) of a field
+
+    Args:
+      name (str): field name
+      index (tuple): index of the region, composed of integers and slices
+
+    Returns:
+      numpy.ndarray: array in the region, which is not added to the cache
+    '''
+
+    if name in self._cache:
+      return self._cache[name][index]
+    elif name in self.primal_fields:
+      return self._assign_units(name, self.reader.read(name, index))
+    elif PlutoFluidInfo.is_blockwise(name):
+      return self._compute_block(name, index)
+    else:
+      return self[name][index]
+
+  def unit(self, name):
+    ''' unit of a field in the current unit system, None if units are not assigned '''
+
+    if self.unit_system is None:
+      return None
+    elif self.unit_system == 'code':
+      unit = PlutoFluidInfo.code_unit(name)
+    else:
+      unit = PlutoFluidInfo.astro_unit(name)
+    return None if unit is None else u.Unit(unit)
+
+  def scale(self, name):
+    ''' factor converting raw values of a field (in code units) to the current unit system
+
+    Args:
+      name (str): field name
+
+    Returns:
+      float: the factor, 1 if arrays already carry units
+    '''
+
+    if self.snapshot.with_units or self.unit_system in [None, 'code']:
+      return 1.0
+    return u.Unit(PlutoFluidInfo.code_unit(name)).to(self.unit(name))
+
+  def quantity(self, name, index=None):
+    ''' field (or a region of it) as units.Quantity in the current unit system
+
+    Args:
+      name (str): field name
+      index (tuple): index of a region. (optional)
+
+    Returns:
+      units.Quantity: a converted copy if units are kept as metadata, the cached raw array is not changed
+    '''
+
+    arr = self[name] if index is None else self.region(name, index)
+    if self.snapshot.with_units or self.unit_system is None:
+      return arr
+    return arr * self.scale(name) * self.unit(name)
 
   def remove(self, name):
     del self._cache[name]
-    self.cache_list.remove(name)
+
+  def load(self, *names):
+    ''' read primal fields mapped from disk into memory, or compute derived fields
+
+    Args:
+      *names (str): field names
+    '''
+
+    for name in names:
+      arr = self[name]
+      if is_mapped(arr):
+        self._cache[name] = np.array(arr)
+
+  def release(self, *names):
+    ''' release cached arrays to free memory, they are read or recomputed on next access
+
+    Args:
+      *names (str): fields to be released. If not given, all cached fields but those assigned by users are released.
+    '''
+
+    if len(names) == 0:
+      fixed = self._cache.fixed
+      names = [name for name in self.cache_list if name not in fixed]
+    for name in names:
+      if name in self._cache:
+        self.remove(name)
+      if name in self.primal_fields and hasattr(self.reader, 'release'):
+        self.reader.release(name)
 
   def info(self, name):
     PlutoFluidInfo.info(name)
 
-  def update_derived_fields(self):
-    pluto_fields = PlutoFluidInfo.known_fields
-    derived_cache_list = list(set(self.cache_list) - set(self.primal_fields))
-    for key in derived_cache_list:
-      f = PlutoFluidInfo.function(key)
-      self._cache[key] = f(self.snapshot).to(u.Unit(pluto_fields[key][3]))
+  def compute(self, *names):
+    ''' compute fields in dependency order, releasing intermediate inputs once no other field needs them
+
+    Args:
+      *names (str): field names
+
+    Returns:
+      list: arrays of the requested fields
+    '''
+
+    order = PlutoFluidInfo.plan(names)
+    kept = set(names) | set(self.cache_list)
+    consumers = {}
+    for name in order:
+      for dep in PlutoFluidInfo.depends(name) or []:
+        consumers[dep] = consumers.get(dep, 0) + 1
+
+    results = {}
+    for name in order:
+      value = self[name]
+      if name in names:
+        results[name] = value
+      for dep in PlutoFluidInfo.depends(name) or []:
+        consumers[dep] -= 1
+        if consumers[dep] == 0 and dep not in kept:
+          self.release(dep)
+
+    return [results[name] for name in names]
+
+  def _cached_derived(self):
+    ''' cached fields computed by functions in PlutoFluidInfo '''
+
+    return [key for key in self.cache_list if key in PlutoFluidInfo.known_fields and PlutoFluidInfo.function(key) is not None]
+
+  def _affected(self, changed):
+    ''' cached derived fields depending on the changed fields, or without declared inputs, in dependency order '''
+
+    changed = set(changed)
+    derived = [key for key in self._cached_derived() if key not in changed]
+    affected = []
+    for key in PlutoFluidInfo.plan(derived):
+      if key not in derived:
+        continue
+      depends = PlutoFluidInfo.depends(key)
+      if depends is None or changed.intersection(depends):
+        affected.append(key)
+        changed.add(key)
+    return affected
+
+  def update_derived_fields(self, *changed):
+    ''' recompute cached derived fields
+
+    Args:
+      *changed (str): fields that have changed, only derived fields depending on them are recomputed. \
+          If not given, all cached derived fields are recomputed.
+    '''
+
+    if len(changed) == 0:
+      keys = self._cached_derived()
+    else:
+      keys = self._affected(changed)
+    for key in keys:
+      self.remove(key)
+    for key in keys:
+      self[key]
 
   @staticmethod
-  def _from_sph(theta, phi, v_r, v_th, v_phi):
+  def _from_sph(sin_theta, cos_theta, sin_phi, cos_phi, v_r, v_th, v_phi):
     ''' from vectors in spherical coordinate to those in cartesian coordinate '''
-    v_x = v_r * np.sin(theta) * np.cos(phi) + v_th * np.cos(theta) * np.cos(phi) - v_phi * np.sin(phi)
-    v_y = v_r * np.sin(theta) * np.sin(phi) + v_th * np.cos(theta) * np.sin(phi) + v_phi * np.cos(phi)
-    v_z = v_r * np.cos(theta) - v_th * np.sin(theta)
+    v_cyl = v_r * sin_theta + v_th * cos_theta
+    v_x = v_cyl * cos_phi - v_phi * sin_phi
+    v_y = v_cyl * sin_phi + v_phi * cos_phi
+    v_z = v_r * cos_theta - v_th * sin_theta
     return v_x, v_y, v_z
 
   @staticmethod
-  def _from_cyl(phi, v_r, v_phi, v_z):
+  def _from_cyl(sin_phi, cos_phi, v_r, v_phi, v_z):
     ''' from vectors in cylindrical coordinate to those in cartesian coordinate '''
-    v_x = v_r * np.cos(phi) - v_phi * np.sin(phi)
-    v_y = v_r * np.sin(phi) + v_phi * np.cos(phi)
+    v_x = v_r * cos_phi - v_phi * sin_phi
+    v_y = v_r * sin_phi + v_phi * cos_phi
     return v_x, v_y, v_z
 
 
-  def to_cartesian(self):
-    ''' convert to cartesian coordinate system
+  def to_cartesian(self, v1='vx1', v2='vx2', v3='vx3', index=None):
+    ''' cartesian components of a vector field
 
-    Currently only support converting velocity (vx1, vx2, vx3).
+    The snapshot is not changed. The trig factors are computed from 1-D coordinates once and cached on the Dataset.
+
+    Args:
+      v1, v2, v3 (str/numpy.ndarray): components along x1, x2 and x3, names of fields or arrays. \
+          Default is velocity (vx1, vx2, vx3).
+      index (tuple): if given, only the region is computed. \
+          Default is None, the whole domain, which is computed block by block.
 
     Returns:
       tuple: the resulted three components
     '''
 
-    v1 = self.snapshot.fields['vx1']
-    v2 = self.snapshot.fields['vx2']
-    v3 = self.snapshot.fields['vx3']
+    if self.snapshot.geometry not in ['SPHERICAL', 'POLAR']:
+      raise KeyError('Only support geometry of [SPHERICAL] and [POLAR].')
+    if index is None:
+      return self.snapshot.blockwise(lambda index: self.to_cartesian(v1, v2, v3, index))
+
+    grids = self.snapshot.grids
+    v = [self.region(v, index) if isinstance(v, str) else v[index] for v in [v1, v2, v3]]
     if self.snapshot.geometry == 'SPHERICAL':
-      theta = self.snapshot.grids['x2']
-      phi = self.snapshot.grids['x3']
-      v1, v2, v3 = self._from_sph(theta, phi, v1, v2, v3)
-    elif self.snapshot.geometry == 'POLAR':
-      phi = self.snapshot.grids['x2']
-      v1, v2, v3 = self._from_cyl(phi, v1, v2, v3)
+      return self._from_sph(*grids.trig('x2', index), *grids.trig('x3', index), *v)
     else:
-      raise KeyError('Only support geometry of [SPHERICAL] and [POLAR].')
+      return self._from_cyl(*grids.trig('x2', index), *v)
+
+
+  def _convert(self, unit_system):
+    ''' convert cached arrays to a unit system, derived fields without defined units are released '''
+
+    recompute = []
+    for key in list(self.cache_list):
+      if key not in PlutoFluidInfo.known_fields:  # arrays assigned by users
+        continue
+      if key in self.primal_fields and key not in self._cache.fixed and is_mapped(self._cache[key]):
+        # not read yet, units are assigned when it is read, block by block if only regions are used
+        self.remove(key)
+        continue
+      unit = PlutoFluidInfo.code_unit(key) if unit_system == 'code' else PlutoFluidInfo.astro_unit(key)
+      if unit is None:
+        recompute.append(key)
+      elif self.snapshot.with_units:
+        self._cache[key] = self._cache[key].to(u.Unit(unit))
+      else:
+        self._cache[key] = self._cache[key] * u.Unit(PlutoFluidInfo.code_unit(key))
+        if unit_system == 'astro':
+          self._cache[key] = self._cache[key].to(u.Unit(unit))
+    self.unit_system = unit_system
 
-    return v1, v2, v3
+    for key in recompute:
+      self.remove(key)
 
 
   def in_code_unit(self):
@@ -100,23 +396,10 @@ class Field(object):
     code_density = self.snapshot.code_unit['code_density']
     code_velocity = self.snapshot.code_unit['code_velocity']
     u.add_enabled_units([code_density, code_length, code_velocity])
-    pluto_fields = PlutoFluidInfo.known_fields
-    if self.snapshot.with_units:
-      for key in self.primal_fields:
-        self._cache[key] = self._cache[key].to(eval(pluto_fields[key][2]))
-    else:
-      for key in self.primal_fields:
-        self._cache[key] *= u.Unit(pluto_fields[key][2])
-
-    self.update_derived_fields()
+    self._convert('code')
 
 
   def in_astro_unit(self):
     ''' convert the units to those commonly used in astro '''
 
-    pluto_fields = PlutoFluidInfo.known_fields
-
-    for key in self.primal_fields:
-      self._cache[key] = self._cache[key].to(pluto_fields[key][3])
-
-    self.update_derived_fields()
+    self._convert('astro')
@@ -2,31 +2,50 @@ import numpy as np
 import astropy.units as u
 
 class Grid(object):
-  ''' Contain the information of grids '''
+  ''' Contain the information of grids
+
+  `grids['x1']` is a read-only view broadcast from the 1-D coordinate, and `grids.sparse('x1')`
+  is the broadcastable array. Use `numpy.array(grids['x1'])` if a writable array is needed.
+  '''
 
   __slots__ = [
     'snapshot',
-    'h1', 'h2', 'h3',
+    'axes',
+    'coord',
+    'code_unit',
+    'astro_unit',
+    'unit_system',
+    '_full',
+    '_geometry',
+    '_units'
+  ]
+
+  coord_keys = [
     'x1', 'x2', 'x3',
     'x1r', 'x2r', 'x3r',
-    'dx1', 'dx2', 'dx3',
+    'dx1', 'dx2', 'dx3'
+  ]
+
+  geometry_keys = [
+    'h1', 'h2', 'h3',
     'dA1', 'dA2', 'dA3',
-    'dV',
-    'code_unit',
-    'astro_unit'
+    'dV'
   ]
 
 
   def __init__(self, snapshot):
     self.snapshot = snapshot
-    self.x1, self.x2, self.x3 = np.meshgrid(snapshot.coord['x1'], snapshot.coord['x2'], snapshot.coord['x3'], indexing='ij')
-    self.dx1, self.dx2, self.dx3 = np.meshgrid(snapshot.coord['dx1'], snapshot.coord['dx2'], snapshot.coord['dx3'], indexing='ij')
-    self.x1r, self.x2r, self.x3r = np.meshgrid(snapshot.coord['x1r'], snapshot.coord['x2r'], snapshot.coord['x3r'], indexing='ij')
-    
-    if snapshot.ndim !=3:
-      for key in self.__slots__[4:13]:
-        tmp = getattr(self, key)
-        setattr(self, key, tmp.squeeze())
+    self.coord = {key: snapshot.coord[key] for key in self.coord_keys}
+    self._full = {}   # full arrays assigned by users, e.g. coordinates transformed to cartesian
+    self._geometry = {}   # memoized geometric quantities
+    self._units = None
+    self.unit_system = None   # None (dimensionless), 'code' or 'astro'
+
+    # axes of field arrays, dimensions with only one cell are squeezed if ndim != 3
+    if snapshot.ndim == 3:
+      self.axes = ['x1', 'x2', 'x3']
+    else:
+      self.axes = [dim for dim in ['x1', 'x2', 'x3'] if len(self.coord[dim]) != 1]
 
     code_length = snapshot.code_unit['code_length']
     if snapshot.geometry == 'CARTESIAN':
@@ -42,95 +61,321 @@ class Grid(object):
     self.update_surf_vol()
 
   def __getitem__(self, key):
+    if key in self._full:
+      return self._full[key]
+    if key in self.coord_keys:
+      return np.broadcast_to(self.sparse(key), self.shape(key), subok=True)
+    if key in self.geometry_keys:
+      return self.geometric(key)
     return getattr(self, key)
 
   def __setitem__(self, key, value):
-    setattr(self, key, value)
+    if key in self.coord_keys:
+      self._full[key] = value
+    else:
+      setattr(self, key, value)
+
+  def __getattr__(self, key):
+    if key in Grid.coord_keys or key in Grid.geometry_keys:
+      return self[key]
+    raise AttributeError(f"'Grid' object has no attribute '{key}'")
+
+  @staticmethod
+  def _dim(key):
+    return 'x'+key.replace('d', '').replace('r', '')[-1]
+
+  def shape(self, key='x1'):
+    ''' shape of the full array of a coordinate, cell edges have one more element in each axis '''
+
+    n = 1 if key.endswith('r') else 0
+    return tuple(len(self.coord[dim]) + n for dim in self.axes)
+
+  def sparse(self, key):
+    ''' broadcastable array of a coordinate
+
+    Args:
+      key (str): one of `coord_keys`
+
+    Returns:
+      numpy.ndarray: in the shape of (n1,1,1), (1,n2,1) or (1,1,n3) for 3-D data, \
+          or a scalar for the squeezed dimension
+    '''
+
+    dim = self._dim(key)
+    vec = self.coord[key]
+    if dim not in self.axes:
+      return vec[0]
+    shape = [1] * len(self.axes)
+    shape[self.axes.index(dim)] = len(vec)
+    return vec.reshape(shape)
 
   def update_surf_vol(self):
-    x1 = self.x1.value if self.snapshot.with_units else self.x1
-    x2 = self.x2.value if self.snapshot.with_units else self.x2
-    if self.snapshot.geometry == 'CARTESIAN':
-      self.h1, self.h2, self.h3 = (1, 1, 1)
-    elif self.snapshot.geometry == 'POLAR':
-      self.h1, self.h2, self.h3 = (1, x1, 1)
+    ''' drop memoized scale factors, surface areas and volume, they are computed again on next access '''
+
+    self._geometry.clear()
+    self._units = tuple(getattr(self.coord[dim], 'unit', None) for dim in ['x1', 'x2', 'x3'])
+
+  def _scale_factors(self):
+    ''' scale factors h1, h2, h3, each in separable form of {dimension: broadcastable factor} '''
+
+    x1 = self.sparse('x1')
+    x2 = self.sparse('x2')
+    if self.snapshot.geometry == 'POLAR':
+      return [{}, {'x1': x1}, {}]
     elif self.snapshot.geometry == 'SPHERICAL':
-      self.h1, self.h2, self.h3 = (1, x1, x1*np.sin(x2))
+      return [{}, {'x1': x1}, {'x1': x1, 'x2': np.sin(x2)}]
+    else:
+      return [{}, {}, {}]
+
+  def _width(self, dim):
+    ''' broadcastable cell widths, those of angles are in radians without unit '''
+
+    width = self.sparse('d'+dim)
+    if getattr(width, 'unit', None) == u.rad:
+      width = width.value
+    return width
+
+  def _length_power(self, key):
+    ''' power of length in the dimension of a geometric quantity, e.g. 3 for dV '''
+
+    length = [int(unit != u.rad) for unit in self.code_unit]
+    radius = [0, int(self.snapshot.geometry in ['POLAR', 'SPHERICAL']), int(self.snapshot.geometry == 'SPHERICAL')]
+    if key.startswith('h'):
+      return radius[int(key[-1])-1]
+    dims = [j for j in range(3) if not (key.startswith('dA') and j == int(key[-1])-1)]
+    return sum(length[j] + radius[j] for j in dims)
+
+  def factors(self, key):
+    ''' separable form of a geometric quantity
+
+    Args:
+      key (str): one of `geometry_keys`
+
+    Returns:
+      dict: {dimension: factor}, the factors are broadcastable arrays depending only on \
+          one dimension, and their product is the quantity
+    '''
+
+    name = 'factors_'+key
+    if name in self._geometry:
+      return self._geometry[name]
+
+    h = self._scale_factors()
+    widths = [{dim: self._width(dim)} for dim in ['x1', 'x2', 'x3']]
+    if key.startswith('h'):
+      parts = [h[int(key[-1])-1]]
+    elif key.startswith('dA'):
+      i = int(key[-1]) - 1
+      parts = [h[j] for j in range(3) if j != i] + [widths[j] for j in range(3) if j != i]
+    elif key == 'dV':
+      parts = h + widths
+    else:
+      raise KeyError(f'{key} is not one of {self.geometry_keys}.')
+
+    factors = {}
+    for part in parts:
+      for dim, f in part.items():
+        factors[dim] = factors[dim] * f if dim in factors else f
+    self._geometry[name] = factors
+    return factors
+
+  def geometric(self, key):
+    ''' scale factor, surface area or volume of cells, memoized
+
+    Returns:
+      numpy.ndarray: broadcastable for scale factors, in the shape of fields for areas and volume
+    '''
+
+    if key not in self._geometry:
+      value = 1
+      for f in self.factors(key).values():
+        value = value * f
+      if not key.startswith('h'):
+        value = np.broadcast_to(value, self.shape(), subok=True)
+      self._geometry[key] = value
+    return self._geometry[key]
+
+  def block(self, key, index):
+    ''' values of a coordinate or geometric quantity in a block
+
+    Args:
+      key (str): one of `coord_keys` or `geometry_keys`
+      index (tuple): index of the block, composed of integers and slices
+
+    Returns:
+      numpy.ndarray: in the shape of the block
+    '''
 
-    self.dA1 = self.h2 * self.h3 * self.dx2 * self.dx3
-    self.dA2 = self.h1 * self.h3 * self.dx1 * self.dx3
-    self.dA3 = self.h1 * self.h2 * self.dx1 * self.dx2
-    self.dV = self.h1 * self.h2 * self.h3 * self.dx1 * self.dx2 * self.dx3
+    if key in self._full:
+      return self._full[key][index]
+    if key in self.coord_keys:
+      factors = {self._dim(key): self.sparse(key)}
+    elif key in self._geometry and not key.startswith('h'):
+      return self._geometry[key][index]
+    else:
+      factors = self.factors(key)
+
+    value = 1
+    for f in factors.values():
+      value = value * self._sub(f, index)
+
+    return np.broadcast_to(value, self._region_shape(index), subok=True)
 
 
   @staticmethod
-  def _from_sph(r, theta, phi):
+  def _from_sph(r, sin_theta, cos_theta, sin_phi, cos_phi):
     ''' from spherical coordinate to cartesian coordinate '''
-    x = r * np.sin(theta) * np.cos(phi)
-    y = r * np.sin(theta) * np.cos(phi)
-    z = r * np.cos(theta)
-    return x, y, z
+    r_cyl = r * sin_theta
+    return r_cyl * cos_phi, r_cyl * sin_phi, r * cos_theta
 
 
   @staticmethod
-  def _from_cyl(r, phi, z):
+  def _from_cyl(r, sin_phi, cos_phi, z):
     ''' from cylindrical coordinate to cartesian coordinate '''
-    x = r * np.cos(phi)
-    y = r * np.sin(phi)
-    return x, y, z
+    return r * cos_phi, r * sin_phi, z
 
 
-  def to_cartesian(self):
-    ''' convert to cartesian coordinate system
+  def trig(self, dim, index=None):
+    ''' sine and cosine of an angular coordinate in broadcastable form
 
-    Currently only support converting cell-centered coordinate (x1, x2, x3).
+    They are computed once from the 1-D vector of cell centers and cached on the Dataset,
+    so all snapshots of the Dataset share them.
+
+    Args:
+      dim (str): 'x2' or 'x3'
+      index (tuple): if given, the factors in the region. (optional)
 
     Returns:
-      tuple: the resulted three components
+      tuple: (sin, cos)
+    '''
+
+    cache = self.snapshot._trig
+    if dim not in cache:
+      x = self.sparse(dim)
+      x = x.to_value(u.rad) if hasattr(x, 'unit') else np.asarray(x)
+      cache[dim] = (np.sin(x), np.cos(x))
+    if index is None:
+      return cache[dim]
+    return tuple(self._sub(f, index) for f in cache[dim])
+
+  @staticmethod
+  def _sub(f, index):
+    ''' region of a broadcastable factor, which stays broadcastable against the region of full arrays '''
+
+    if np.ndim(f) == 0:
+      return f
+    sub = tuple(i if n != 1 else (0 if np.ndim(i) == 0 and not isinstance(i, slice) else slice(None)) \
+        for i, n in zip(index, np.shape(f)))
+    return f[sub]
+
+  def _region_shape(self, index):
+    return tuple(len(range(*i.indices(n))) for i, n in zip(index, self.shape()) if isinstance(i, slice))
+
+
+  def cartesian(self, index=None):
+    ''' cartesian coordinates (x, y, z) of cell centers, the snapshot is not changed
+
+    Args:
+      index (tuple): index of a region, composed of integers and slices. Default is None, the whole domain.
+
+    Returns:
+      tuple: (x, y, z)
     '''
 
+    if index is None:
+      index = tuple(slice(None) for _ in self.axes)
+    x1, x2, x3 = [self._sub(self.sparse(dim), index) for dim in ['x1', 'x2', 'x3']]
     if self.snapshot.geometry == 'SPHERICAL':
-      x1, x2, x3 = self._from_sph(self.x1, self.x2, self.x3)
+      xyz = self._from_sph(x1, *self.trig('x2', index), *self.trig('x3', index))
     elif self.snapshot.geometry == 'POLAR':
-      x1, x2, x3 = self._from_cyl(self.x1, self.x2, self.x3)
+      xyz = self._from_cyl(x1, *self.trig('x2', index), x3)
     else:
       raise KeyError('Only support geometry of [SPHERICAL] and [POLAR].')
 
-    return x1, x2, x3
+    shape = self._region_shape(index)
+    return tuple(np.broadcast_to(x, shape, subok=True) for x in xyz)
+
+
+  def to_cartesian(self):
+    ''' convert to cartesian coordinate system
+
+    Currently only support converting cell-centered coordinate (x1, x2, x3).
+
+    Returns:
+      tuple: the resulted three components
+    '''
+
+    return self.cartesian()
+
+
+  def _convert(self, arrays, units, assign):
+    ''' convert units of arrays of coordinates in a dict '''
+
+    for key in list(arrays.keys()):
+      unit = units[int(self._dim(key)[-1])-1]
+      if assign:
+        arrays[key] = arrays[key] * unit
+      else:
+        arrays[key] = arrays[key].to(unit)
 
 
   def in_code_unit(self):
     ''' Assign code units '''
 
-    if self.snapshot.with_units:
-      for key in self.__slots__[4:13]:
-        if 'x1' in key:
-          self[key] = self[key].to(self.code_unit[0])
-        elif 'x2' in key:
-          self[key] = self[key].to(self.code_unit[1])
-        elif 'x3' in key:
-          self[key] = self[key].to(self.code_unit[2])
-    else:
-      for key in self.__slots__[4:13]:
-        if 'x1' in key:
-          self[key] *= self.code_unit[0]
-        elif 'x2' in key:  
-          self[key] *= self.code_unit[1]
-        elif 'x3' in key:  
-          self[key] *= self.code_unit[2]
+    self._convert(self.coord, self.code_unit, not self.snapshot.with_units)
+    self._convert(self._full, self.code_unit, not self.snapshot.with_units)
+    self.unit_system = 'code'
 
-    self.update_surf_vol()
+    self._invalidate()
 
 
   def in_astro_unit(self):
     ''' convert the units to those commonly used in astro '''
 
-    for key in self.__slots__[4:13]:
-      if 'x1' in key:
-        self[key] = self[key].to(self.astro_unit[0])
-      elif 'x2' in key:
-        self[key] = self[key].to(self.astro_unit[1])
-      elif 'x3' in key:
-        self[key] = self[key].to(self.astro_unit[2])
+    self._convert(self.coord, self.astro_unit, False)
+    self._convert(self._full, self.astro_unit, False)
+    self.unit_system = 'astro'
 
-    self.update_surf_vol()
+    self._invalidate()
+
+
+  def unit(self, key):
+    ''' unit of a coordinate or geometric quantity in the current unit system
+
+    Args:
+      key (str): coordinate (e.g. 'x1') or geometric quantity (e.g. 'h3', 'dA1', 'dV')
+
+    Returns:
+      units.Unit: e.g. length^2 for areas and length^3 for volume, None if units are not assigned
+    '''
+
+    if self.unit_system is None:
+      return None
+    units = self.code_unit if self.unit_system == 'code' else self.astro_unit
+    if key in self.coord_keys:
+      return units[int(self._dim(key)[-1])-1]
+    return u.Unit(units[0] ** self._length_power(key))
+
+  def scale(self, key):
+    ''' factor converting raw values (in code units) to the current unit system
+
+    Args:
+      key (str): coordinate or geometric quantity, refer to unit()
+
+    Returns:
+      float: the factor, 1 if arrays already carry units
+    '''
+
+    if self.snapshot.with_units or self.unit_system in [None, 'code']:
+      return 1.0
+    if key in self.coord_keys:
+      i = int(self._dim(key)[-1]) - 1
+      return self.code_unit[i].to(self.astro_unit[i])
+    return self.code_unit[0].to(self.astro_unit[0]) ** self._length_power(key)
+
+  def _invalidate(self):
+    ''' drop memoized geometric quantities only if the units of coordinates changed '''
+
+    units = tuple(getattr(self.coord[dim], 'unit', None) for dim in ['x1', 'x2', 'x3'])
+    if units != self._units:
+      self.update_surf_vol()
@@ -0,0 +1,523 @@
+import io
+import os
+import json
+import numpy as np
+import pandas as pd
+
+
+def read_grid(output_dir):
+  ''' read grid information from grid.out, following the convention of `pyPLUTO.pload`
+
+  Args:
+    output_dir (str): path to the directory where grid.out locates
+
+  Returns:
+    tuple: (index, coord), two dicts in the format of `Snapshot.index` and `Snapshot.coord`
+  '''
+
+  nmax = []
+  xl = []
+  xr = []
+  with open(output_dir+'grid.out', 'r') as gfp:
+    for line in gfp.readlines():
+      words = line.split()
+      if len(words) == 0 or words[0].startswith('#'):
+        continue
+      if len(words) == 1:
+        nmax.append(int(words[0]))
+      elif len(words) == 3:
+        xl.append(float(words[1]))
+        xr.append(float(words[2]))
+
+  xl = np.asarray(xl)
+  xr = np.asarray(xr)
+  index = {}
+  coord = {}
+  start = 0
+  for i, n in enumerate(nmax):
+    dim = 'x'+str(i+1)
+    left = xl[start:start+n]
+    right = xr[start:start+n]
+    index['n'+str(i+1)] = n
+    index['n'+str(i+1)+'_tot'] = n
+    coord[dim] = 0.5*(left+right)
+    coord['d'+dim] = right-left
+    coord[dim+'r'] = np.append(left, right[-1])
+    start += n
+
+  return index, coord
+
+
+def is_mapped(arr):
+  ''' whether an array is (a view of) a memory map of file '''
+
+  while arr is not None:
+    if isinstance(arr, np.memmap):
+      return True
+    arr = getattr(arr, 'base', None)
+  return False
+
+
+class OutputLog(object):
+  ''' Index of the output log file (e.g. dbl.out)
+
+  Args:
+    filename (str): path to the log file
+
+  Attributes:
+    nfile (numpy.ndarray): number of output files
+    time (numpy.ndarray): simulation time of outputs
+    dt (numpy.ndarray): time step of outputs
+    nstep (numpy.ndarray): integration step of outputs
+    lastline (list): words in the last line, where file type, endianess and variables are recorded
+
+  Methods:
+    refresh():
+    last():
+    nearest(time):
+    position(ns):
+    info(ns):
+  '''
+
+  __slots__ = [
+    'filename',
+    'nfile',
+    'time',
+    'dt',
+    'nstep',
+    'lastline',
+    '_offset'
+  ]
+
+  def __init__(self, filename):
+    self.filename = filename
+    self.nfile = np.empty(0, dtype=int)
+    self.time = np.empty(0)
+    self.dt = np.empty(0)
+    self.nstep = np.empty(0, dtype=int)
+    self.lastline = []
+    self._offset = 0
+    self.refresh()
+
+  def __len__(self):
+    return len(self.nfile)
+
+  def refresh(self):
+    ''' parse the lines appended to the log file since last call
+
+    Returns:
+      bool: whether new outputs are found
+    '''
+
+    size = os.stat(self.filename).st_size
+    if size < self._offset:  # the log was rewritten, parse it again
+      self.__init__(self.filename)
+      return True
+    if size == self._offset:
+      return False
+
+    with open(self.filename, 'rb') as vfp:
+      vfp.seek(self._offset)
+      chunk = vfp.read(size - self._offset)
+    end = chunk.rfind(b'\n') + 1  # skip the last line if it is still being written
+    if end == 0:
+      return False
+    self._offset += end
+
+    lines = [line.split() for line in chunk[:end].decode().splitlines()]
+    lines = [words for words in lines if len(words) > 3]
+    if len(lines) == 0:
+      return False
+    nfile = np.concatenate([self.nfile, [int(words[0]) for words in lines]])
+    # outputs rewritten after a restart replace the old ones, i.e. a line is kept if all later numbers are larger
+    later = np.append(np.minimum.accumulate(nfile[::-1])[::-1][1:], np.iinfo(int).max)
+    keep = nfile < later
+    self.nfile = nfile[keep]
+    self.time = np.concatenate([self.time, [float(words[1]) for words in lines]])[keep]
+    self.dt = np.concatenate([self.dt, [float(words[2]) for words in lines]])[keep]
+    self.nstep = np.concatenate([self.nstep, [int(words[3]) for words in lines]])[keep]
+    self.lastline = lines[-1]
+    return True
+
+  def last(self):
+    ''' number of the last output file '''
+
+    return int(self.nfile[-1])
+
+  def nearest(self, time):
+    ''' number of the output file whose time is nearest to the given time, found by binary search '''
+
+    i = np.searchsorted(self.time, time)
+    if i == len(self.time) or (i > 0 and time - self.time[i-1] <= self.time[i] - time):
+      i -= 1
+    return int(self.nfile[i])
+
+  def position(self, ns):
+    ''' position of the output file `ns` in the log '''
+
+    i = ns if ns < len(self.nfile) and self.nfile[ns] == ns else np.searchsorted(self.nfile, ns)
+    if i == len(self.nfile) or self.nfile[i] != ns:
+      raise FileNotFoundError(f'Output {ns} is not recorded in {self.filename}.')
+    return int(i)
+
+  def info(self, ns):
+    ''' simulation time and time step of the output file `ns`
+
+    Returns:
+      tuple: (time, dt)
+    '''
+
+    i = self.position(ns)
+    return float(self.time[i]), float(self.dt[i])
+
+
+class HistoryLog(object):
+  ''' Columns of a history file (e.g. hist.out) written by the Analysis() function of PLUTO
+
+  Args:
+    filename (str): path to the history file
+    cache_dir (str): directory of binary columns reused by later sessions. Default is None, columns are kept in memory only.
+
+  Attributes:
+    columns (list): names of columns in the header, the first one is time
+
+  Methods:
+    refresh():
+    decimate(points, *columns):
+    frame(*columns, points=None):
+  '''
+
+  __slots__ = [
+    'filename',
+    'cache_dir',
+    'columns',
+    '_header',
+    '_tail',
+    '_offset',
+    '_rows',
+    '_data'
+  ]
+
+  def __init__(self, filename, cache_dir=None):
+    self.filename = filename
+    self.cache_dir = cache_dir
+    if cache_dir is not None:
+      try:
+        os.makedirs(cache_dir, exist_ok=True)
+      except OSError:
+        pass
+      if not os.access(cache_dir, os.W_OK):  # e.g. data of others, kept in memory only
+        self.cache_dir = None
+    self._reset()
+    if self.cache_dir is not None:
+      self._restore()
+    self.refresh()
+
+  def __len__(self):
+    return self._rows
+
+  def __getitem__(self, name):
+    if name not in self.columns:
+      raise KeyError(f'Column [{name}] is not in {self.filename}, available columns are {self.columns}.')
+    return self._data[self.columns.index(name)]
+
+  def _reset(self):
+    self.columns = []
+    self._header = b''
+    self._tail = b''
+    self._offset = 0
+    self._rows = 0
+    self._data = []
+
+  def _path(self, suffix):
+    return os.path.join(self.cache_dir, os.path.basename(self.filename) + suffix)
+
+  def _map(self, i, rows):
+    if rows == 0:
+      return np.empty(0)
+    return np.memmap(self._path(f'.{i:03d}.f8'), dtype=float, mode='r', shape=(rows,))
+
+  def _restore(self):
+    ''' memory-map the columns cached by previous sessions, if the file still starts with the lines they were parsed from '''
+
+    try:
+      with open(self._path('.json'), 'r') as f:
+        meta = json.load(f)
+      header = meta['header'].encode('latin-1')
+      tail = meta['tail'].encode('latin-1')
+      with open(self.filename, 'rb') as hfp:
+        matched = hfp.read(len(header)) == header
+        hfp.seek(meta['offset'] - len(tail))
+        matched &= hfp.read(len(tail)) == tail
+      if not matched:
+        return
+      data = [self._map(i, meta['rows']) for i in range(len(meta['columns']))]
+    except (OSError, ValueError, KeyError, TypeError):  # e.g. no or truncated cache files, parse hist.out again
+      try:
+        os.remove(self._path('.json'))
+      except OSError:
+        pass
+      return
+    self.columns = meta['columns']
+    self._header = header
+    self._tail = tail
+    self._offset = meta['offset']
+    self._rows = meta['rows']
+    self._data = data
+
+  def refresh(self):
+    ''' parse the lines appended to the history file since last call
+
+    Returns:
+      bool: whether new rows are found
+    '''
+
+    size = os.stat(self.filename).st_size
+    if size < self._offset:  # the file was rewritten, parse it again
+      self._reset()
+    if size == self._offset:
+      return False
+
+    with open(self.filename, 'rb') as hfp:
+      hfp.seek(self._offset)
+      chunk = hfp.read(size - self._offset)
+    end = chunk.rfind(b'\n') + 1  # skip the last line if it is still being written
+    if end == 0:
+      return False
+    text = chunk[:end]
+
+    if self._offset == 0:
+      first = text[:text.find(b'\n')+1]
+      words = first.decode('latin-1').lstrip('#').split()
+      try:
+        float(words[0])
+      except (IndexError, ValueError):
+        self.columns = words
+        self._header = first
+    table = self._parse(text)
+    if len(self.columns) == 0:
+      self.columns = ['t'] + [f'c{i}' for i in range(1, table.shape[1])]
+
+    self._append(table)
+    self._offset += end
+    self._tail = (self._tail + text)[-64:]
+    if self.cache_dir is not None:
+      meta = {'columns': self.columns, 'header': self._header.decode('latin-1'), \
+          'tail': self._tail.decode('latin-1'), 'offset': self._offset, 'rows': self._rows}
+      tmp = self._path(f'.json.{os.getpid()}.tmp')
+      with open(tmp, 'w') as f:
+        json.dump(meta, f)
+      os.replace(tmp, self._path('.json'))
+    return len(table) > 0
+
+  def _parse(self, text):
+    ''' rows of lines as a 2-D array '''
+
+    if self._header:
+      text = text.replace(self._header, b'')  # the header is written again after restarts
+    if len(text.strip()) == 0:
+      return np.empty((0, max(1, len(self.columns))))
+    table = pd.read_csv(io.BytesIO(text), sep=r'\s+', header=None, comment='#', dtype=float, engine='c', \
+        names=self.columns if self.columns else None)
+    return table.to_numpy()
+
+  def _append(self, table):
+    ''' append rows, rows not earlier than the first new one are replaced, which were written before a restart '''
+
+    if len(table) == 0:
+      return
+    # restarts within the new rows, i.e. a row is kept if all later times are larger
+    later = np.append(np.minimum.accumulate(table[::-1, 0])[::-1][1:], np.inf)
+    table = table[table[:, 0] < later]
+    keep = self._rows
+    if keep > 0 and table[0, 0] <= self._data[0][-1]:
+      keep = int(np.searchsorted(self._data[0], table[0, 0], 'left'))
+    rows = keep + len(table)
+
+    if self.cache_dir is None:
+      old = self._data if self._data else [np.empty(0)]*table.shape[1]
+      self._data = [np.concatenate([col[:keep], table[:, i]]) for i, col in enumerate(old)]
+      self._rows = rows
+      return
+
+    for i in range(table.shape[1]):
+      path = self._path(f'.{i:03d}.f8')
+      new = np.ascontiguousarray(table[:, i], dtype=float).tobytes()
+      if keep < self._rows or keep == 0:  # to a new file, since the old one may still be mapped
+        tmp = path + f'.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as f:
+          if keep > 0:
+            f.write(np.asarray(self._data[i][:keep]).tobytes())
+          f.write(new)
+        os.replace(tmp, path)
+      else:
+        with open(path, 'ab') as f:
+          f.truncate(keep * 8)  # drop bytes left by an interrupted session
+          f.write(new)
+    self._rows = rows
+    self._data = [self._map(i, rows) for i in range(table.shape[1])]
+
+  def decimate(self, points, *columns):
+    ''' indices of rows to plot, keeping the minimum and maximum of each column in each of `points` buckets
+
+    Args:
+      points (int): number of buckets. If it is None or there are fewer than 2*points rows, all rows are kept.
+      columns (str): names of columns. Default is all columns but time.
+
+    Returns:
+      numpy.ndarray: sorted indices, including the first and the last rows
+    '''
+
+    n = self._rows
+    if points is None or n <= 2*points:
+      return np.arange(n)
+    size = -(-n // points)
+    m = n // size * size
+    start = np.arange(0, m, size)
+    index = [np.array([0, n-1])]
+    for name in columns or self.columns[1:]:
+      col = self[name]
+      blocks = np.asarray(col[:m]).reshape(-1, size)
+      index += [start + np.argmin(blocks, axis=1), start + np.argmax(blocks, axis=1)]
+      if m < n:
+        index.append(m + np.array([np.argmin(col[m:]), np.argmax(col[m:])]))
+    return np.unique(np.concatenate(index))
+
+  def frame(self, *columns, points=None):
+    ''' columns as a DataFrame indexed by time
+
+    Args:
+      columns (str): names of columns. Default is all columns but time.
+      points (int): number of buckets for min/max decimation, refer to decimate(). Default is None, all rows.
+
+    Returns:
+      pandas.DataFrame
+    '''
+
+    columns = list(columns) or self.columns[1:]
+    index = self.decimate(points, *columns)
+    data = {name: np.asarray(self[name][index]) for name in columns}
+    return pd.DataFrame(data, index=pd.Index(np.asarray(self._data[0][index]), name=self.columns[0]))
+
+
+class Reader(object):
+  ''' Memory-mapped reader for PLUTO binary outputs (.dbl/.flt)
+
+  Args:
+    ns (int): number of the output file
+    dataset (Dataset): provides `output_dir`, `datatype`, `filetype`, `endianess`, `field_list` and `ndim`
+    index (dict): number of cells in each direction, in the format of `Snapshot.index`
+
+  Attributes:
+    shape (tuple): shape of each variable in the order of (x1, x2, x3)
+    dtype (numpy.dtype): data type including the byte order
+
+  Methods:
+    read(name, index=None):
+    release(name=None):
+    filename(name):
+    complete():
+  '''
+
+  __slots__ = [
+    'ns',
+    'output_dir',
+    'datatype',
+    'filetype',
+    'field_list',
+    'ndim',
+    'shape',
+    'dtype',
+    '_maps'
+  ]
+
+  dtypes = {'dbl': 'f8', 'flt': 'f4'}
+  byteorders = {'little': '<', 'big': '>'}
+
+  def __init__(self, ns, dataset, index):
+    if dataset.datatype not in self.dtypes:
+      raise TypeError(f'Reader only supports datatype of {list(self.dtypes)}, now it is {dataset.datatype}.')
+
+    self.ns = ns
+    self.output_dir = dataset.output_dir
+    self.datatype = dataset.datatype
+    self.filetype = dataset.filetype
+    self.field_list = dataset.field_list
+    self.ndim = dataset.ndim
+    self.shape = (index['n1'], index['n2'], index['n3'])
+    self.dtype = np.dtype(self.byteorders[dataset.endianess]+self.dtypes[self.datatype])
+    self._maps = {}
+
+  def filename(self, name):
+    ''' return the file where the variable `name` is stored '''
+
+    if self.filetype == 'single_file':
+      return self.output_dir+f'data.{self.ns:04d}.{self.datatype}'
+    else:
+      return self.output_dir+f'{name}.{self.ns:04d}.{self.datatype}'
+
+  def complete(self):
+    ''' whether the data files are completely written, judged by their sizes '''
+
+    size = int(np.prod(self.shape)) * self.dtype.itemsize
+    if self.filetype == 'single_file':
+      files = {self.filename(self.field_list[0]): size * len(self.field_list)}
+    else:
+      files = {self.filename(name): size for name in self.field_list}
+    try:
+      return all(os.stat(f).st_size >= n for f, n in files.items())
+    except FileNotFoundError:
+      return False
+
+  def read(self, name, index=None):
+    ''' map a variable to memory
+
+    Args:
+      name (str): variable name listed in `field_list`
+      index (tuple): if given, only the region (hyperslab) is read, \
+          which costs the I/O of the strided bytes in the region. (optional)
+
+    Returns:
+      numpy.memmap: copy-on-write array in the shape of `Grid` arrays, edits are never written to the file, \
+          or numpy.ndarray of the region if `index` is given
+    '''
+
+    if index is not None:
+      return np.array(self.read(name)[index])
+    if name in self._maps:
+      return self._maps[name]
+    if name not in self.field_list:
+      raise KeyError(f'The field {name} is not stored in output {self.ns}.')
+
+    offset = 0
+    if self.filetype == 'single_file':
+      offset = self.field_list.index(name) * int(np.prod(self.shape)) * self.dtype.itemsize
+
+    arr = np.memmap(self.filename(name), dtype=self.dtype, mode='c', offset=offset, shape=self.shape, order='F')
+    if self.ndim != 3:
+      arr = arr.squeeze()
+    self._maps[name] = arr
+    return arr
+
+  def release(self, name=None):
+    ''' close the memory map of a variable, or all of them if `name` is None '''
+
+    if name is None:
+      self._maps.clear()
+    else:
+      self._maps.pop(name, None)
+
+
+class PloadReader(object):
+  ''' Adapter of `pyPLUTO.pload` for datatypes not supported by `Reader` (e.g. vtk, hdf5) '''
+
+  __slots__ = ['data']
+
+  def __init__(self, ns, dataset):
+    import pyPLUTO.pload as pp
+    self.data = pp.pload(ns, w_dir=dataset.output_dir, datatype=dataset.datatype)
+
+  def read(self, name, index=None):
+    if index is not None:
+      return getattr(self.data, name)[index]
+    return getattr(self.data, name)
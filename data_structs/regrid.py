@@ -0,0 +1,213 @@
+import itertools
+import numpy as np
+
+
+def _wrap(phi, start):
+  ''' wrap azimuthal angles into [start, start + 2pi) '''
+  return (phi - start) % (2*np.pi) + start
+
+
+# Mappings between curvilinear coordinates of the resampled dimensions and cartesian ones
+# (geometry, dimensions) : (names of cartesian axes, forward(q, fixed), inverse(c, fixed), periodic dimensions)
+_mappings = {
+  ('SPHERICAL', ('x1', 'x2')): (
+    ['R', 'z'],
+    lambda q, f: [q[0]*np.sin(q[1]), q[0]*np.cos(q[1])],
+    lambda c, f: [np.hypot(c[0], c[1]), np.arctan2(c[0], c[1])],
+    []),
+  ('SPHERICAL', ('x1', 'x3')): (
+    ['x', 'y'],
+    lambda q, f: [q[0]*np.sin(f['x2'])*np.cos(q[1]), q[0]*np.sin(f['x2'])*np.sin(q[1])],
+    lambda c, f: [np.hypot(c[0], c[1])/np.sin(f['x2']), np.arctan2(c[1], c[0])],
+    ['x3']),
+  ('SPHERICAL', ('x1', 'x2', 'x3')): (
+    ['x', 'y', 'z'],
+    lambda q, f: [q[0]*np.sin(q[1])*np.cos(q[2]), q[0]*np.sin(q[1])*np.sin(q[2]), q[0]*np.cos(q[1])],
+    lambda c, f: [np.sqrt(c[0]**2+c[1]**2+c[2]**2), np.arctan2(np.hypot(c[0], c[1]), c[2]), np.arctan2(c[1], c[0])],
+    ['x3']),
+  ('POLAR', ('x1', 'x2')): (
+    ['x', 'y'],
+    lambda q, f: [q[0]*np.cos(q[1]), q[0]*np.sin(q[1])],
+    lambda c, f: [np.hypot(c[0], c[1]), np.arctan2(c[1], c[0])],
+    ['x2']),
+  ('POLAR', ('x1', 'x3')): (
+    ['R', 'z'],
+    lambda q, f: [q[0], q[1]],
+    lambda c, f: [c[0], c[1]],
+    []),
+  ('POLAR', ('x1', 'x2', 'x3')): (
+    ['x', 'y', 'z'],
+    lambda q, f: [q[0]*np.cos(q[1]), q[0]*np.sin(q[1]), q[2]],
+    lambda c, f: [np.hypot(c[0], c[1]), np.arctan2(c[1], c[0]), c[2]],
+    ['x2']),
+}
+
+
+class Regridder(object):
+  ''' Resample a plane or volume of curvilinear data onto a uniform cartesian grid, refer to `Dataset.regridder()`
+
+  Args:
+    geometry (str): 'SPHERICAL', 'POLAR' or 'CARTESIAN'
+    coord (dict): 1-D coordinates of cell centers and edges, in the format of `Snapshot.coord`
+    axes (list): coordinates corresponding to the axes of field arrays, e.g. ['x1', 'x2', 'x3']
+    resolution (int/tuple): number of pixels along the longest side, pixels are square. \
+        Or the number of pixels along each axis. Default is 512.
+    extent (tuple): (min, max) of each cartesian axis in the units of coordinates, \
+        e.g. ((0, 10), (-10, 10)). Default is None, the bounding box of the data.
+    method (str): 'nearest' (the cell containing the pixel) or 'linear' (multilinear interpolation \
+        in curvilinear coordinates). Default is 'nearest'.
+    fixed (dict): indices of the fixed dimensions of a plane in 3-D data, e.g. {'x3': 0}. (optional)
+
+  Attributes:
+    names (list): names of cartesian axes, e.g. ['R', 'z'] for a meridional plane of spherical data
+    coords (list): 1-D coordinates of pixel centers along each cartesian axis
+    extent (list): (min, max) of each cartesian axis, e.g. for `matplotlib.pyplot.imshow` after flattening
+    index (tuple): index of the plane (or volume) in field arrays
+
+  Methods:
+    apply(values):
+  '''
+
+  __slots__ = [
+    'geometry',
+    'method',
+    'names',
+    'coords',
+    'extent',
+    'index',
+    '_dims',
+    '_shape',
+    '_base',
+    '_offsets',
+    '_weights',
+    '_valid'
+  ]
+
+  methods = ['nearest', 'linear']
+
+  def __init__(self, geometry, coord, axes, resolution=512, extent=None, method='nearest', fixed=None):
+    if method not in self.methods:
+      raise ValueError(f'Method should be one of {self.methods}, now it is {method}.')
+    fixed = {} if fixed is None else fixed
+    value = lambda key: np.asarray(getattr(coord[key], 'value', coord[key]), dtype=float)
+
+    self.geometry = geometry
+    self.method = method
+    self._dims = [dim for dim in axes if dim not in fixed]
+    self.index = tuple(fixed[dim] if dim in fixed else slice(None) for dim in axes)
+    self._shape = tuple(len(coord[dim]) for dim in self._dims)
+
+    # values of fixed dimensions, including those squeezed in 2-D data
+    planes = {dim: value(dim)[fixed.get(dim, 0)] for dim in ['x1', 'x2', 'x3'] if dim not in self._dims}
+    if geometry == 'CARTESIAN':
+      names, forward, inverse, periodic = self._dims, lambda q, f: q, lambda c, f: c, []
+    elif (geometry, tuple(self._dims)) in _mappings:
+      names, forward, inverse, periodic = _mappings[(geometry, tuple(self._dims))]
+    else:
+      raise ValueError(f'Cannot resample dimensions {self._dims} of {geometry} geometry onto a cartesian grid.')
+    self.names = list(names)
+
+    if extent is None:
+      extent = self._bounding_box([value(dim+'r') for dim in self._dims], forward, planes)
+    self.extent = [tuple(float(e) for e in ext) for ext in extent]
+    lengths = [hi - lo for lo, hi in self.extent]
+    if np.ndim(resolution) == 0:
+      size = max(lengths) / resolution
+      resolution = [max(1, int(round(length / size))) for length in lengths]
+    self.coords = [lo + (np.arange(n) + 0.5) * (hi - lo) / n for (lo, hi), n in zip(self.extent, resolution)]
+
+    # curvilinear coordinates of pixels
+    pixels = np.meshgrid(*self.coords, indexing='ij', sparse=True)
+    q = inverse(pixels, planes)
+    q = [np.broadcast_to(x, tuple(resolution)) for x in q]
+    for i, dim in enumerate(self._dims):
+      if dim in periodic:
+        q[i] = _wrap(q[i], value(dim+'r')[0])
+
+    valid = np.ones(tuple(resolution), dtype=bool)
+    index = []
+    weight = []
+    for i, dim in enumerate(self._dims):
+      edges = value(dim+'r')
+      centers = value(dim)
+      valid &= (q[i] >= edges[0]) & (q[i] <= edges[-1])
+      if method == 'nearest':
+        index.append(np.clip(np.searchsorted(edges, q[i], 'right') - 1, 0, len(centers)-1))
+      else:
+        j = np.clip(np.searchsorted(centers, q[i], 'right') - 1, 0, max(0, len(centers)-2))
+        if len(centers) > 1:
+          t = np.clip((q[i] - centers[j]) / (centers[j+1] - centers[j]), 0, 1)
+        else:
+          t = np.zeros(q[i].shape)
+        index.append(j)
+        weight.append(t)
+
+    # flat indices in Fortran order of the plane (or volume), which is the order of data files
+    self._valid = valid
+    self._base = np.where(valid, np.ravel_multi_index(index, self._shape, order='F'), 0)
+    if method == 'nearest':
+      self._offsets = [0]
+      self._weights = None
+    else:
+      strides = np.cumprod((1,) + self._shape[:-1])
+      self._offsets = []
+      self._weights = []
+      for corner in itertools.product([0, 1], repeat=len(self._dims)):
+        if any(c == 1 and n == 1 for c, n in zip(corner, self._shape)):
+          continue
+        w = np.ones(valid.shape)
+        for c, t in zip(corner, weight):
+          w = w * (t if c else 1 - t)
+        self._offsets.append(int(np.dot(corner, strides)))
+        self._weights.append(w)
+
+  def __repr__(self):
+    shape = tuple(len(x) for x in self.coords)
+    return f'Regridder({self.geometry}, {self._dims} -> {self.names}, shape={shape}, method={self.method!r})'
+
+  @staticmethod
+  def _bounding_box(edges, forward, planes):
+    ''' extent of the cartesian coordinates of cell edges '''
+
+    if len(edges) == 3:  # the inner and outer boundaries are enough for the first dimension
+      edges = [edges[0][[0, -1]]] + edges[1:]
+    points = forward(np.meshgrid(*edges, indexing='ij', sparse=True), planes)
+    return [(np.min(p), np.max(p)) for p in points]
+
+  @property
+  def shape(self):
+    ''' shape of resampled arrays '''
+
+    return self._valid.shape
+
+  def apply(self, values, fill=np.nan):
+    ''' resample an array
+
+    Args:
+      values (numpy.ndarray/units.Quantity): data on the plane (or volume), i.e. field arrays indexed by `index`
+      fill (float): value of pixels outside the data. Default is NaN.
+
+    Returns:
+      numpy.ndarray/units.Quantity: in the shape of `shape`, axes in the order of `names`
+    '''
+
+    if np.shape(values) != self._shape:
+      raise ValueError(f'Shape of data {np.shape(values)} does not match the grid {self._shape}.')
+    unit = getattr(values, 'unit', None)
+    flat = np.ravel(getattr(values, 'value', values), order='F')
+
+    if self._weights is None:
+      out = flat[self._base]
+      if not np.issubdtype(out.dtype, np.floating):
+        out = out.astype(float)
+    else:
+      out = 0
+      for offset, w in zip(self._offsets, self._weights):
+        out = out + w * flat[self._base + offset]
+    out[~self._valid] = fill
+    return out if unit is None else out * unit
+
+  def __call__(self, snapshot, field):
+    ''' resample a field of a snapshot, only the plane is read if the field is not cached '''
+
+    return self.apply(snapshot.fields.region(field, self.index))
@@ -0,0 +1,85 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class SnapshotSeries(object):
+  ''' Time series of snapshots in a Dataset, whose fields are read ahead in a background thread while iterating
+
+  Args:
+    dataset (Dataset): the dataset snapshots belong to
+    numbers (list): numbers of output files in the series
+    fields (list): fields read in the background. Default is None, all primal fields in `field_list`.
+    prefetch (int): number of snapshots read ahead. 0 means no background reading. Default is 1.
+
+  Attributes:
+    time (numpy.ndarray): simulation time of snapshots in the series
+
+  Methods:
+    between(t0, t1):
+  '''
+
+  __slots__ = [
+    'dataset',
+    'numbers',
+    'fields',
+    'prefetch'
+  ]
+
+  def __init__(self, dataset, numbers, fields=None, prefetch=1):
+    self.dataset = dataset
+    self.numbers = [int(ns) for ns in numbers]
+    self.fields = fields
+    self.prefetch = prefetch
+
+  def __len__(self):
+    return len(self.numbers)
+
+  def __getitem__(self, index):
+    if isinstance(index, slice):
+      return SnapshotSeries(self.dataset, self.numbers[index], self.fields, self.prefetch)
+    return self.dataset[self.numbers[index]]
+
+  def __iter__(self):
+    if self.prefetch <= 0:
+      for ns in self.numbers:
+        yield self._open(ns)
+      return
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    futures = deque()
+    try:
+      for ns in self.numbers:
+        # the snapshot is opened here, only reading fields is left to the thread
+        futures.append(executor.submit(self._load, self.dataset[ns]))
+        if len(futures) > self.prefetch:
+          yield futures.popleft().result()
+      while futures:
+        yield futures.popleft().result()
+    finally:
+      executor.shutdown(wait=True, cancel_futures=True)
+
+  def __repr__(self):
+    return f'SnapshotSeries({self.numbers})'
+
+  @property
+  def time(self):
+    log = self.dataset._log
+    return log.time[[log.position(ns) for ns in self.numbers]]
+
+  def _open(self, ns):
+    ''' open a snapshot and read its fields into memory '''
+
+    return self._load(self.dataset[ns])
+
+  def _load(self, snapshot):
+    ''' read the fields of an opened snapshot into memory '''
+
+    fields = snapshot.field_list if self.fields is None else self.fields
+    snapshot.fields.load(*fields)
+    return snapshot
+
+  def between(self, t0, t1):
+    ''' snapshots in the series whose time is in [t0, t1] '''
+
+    numbers = [ns for ns, t in zip(self.numbers, self.time) if t0 <= t <= t1]
+    return SnapshotSeries(self.dataset, numbers, self.fields, self.prefetch)
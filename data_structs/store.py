@@ -0,0 +1,213 @@
+import os
+import json
+import zipfile
+import itertools
+import numpy as np
+
+
+def default_chunks(shape, chunk_cells=2**20):
+  ''' shape of chunks, slabs along the last axis of about `chunk_cells` cells, refer to blocks.slabs() '''
+
+  cells = int(np.prod(shape[:-1]))
+  return tuple(shape[:-1]) + (max(1, min(shape[-1], chunk_cells // max(1, cells))),)
+
+
+def _chunk_key(c):
+  return '_'.join(str(i) for i in c)
+
+
+def _chunk_grid(shape, chunks):
+  ''' positions of chunks covering an array, and their index tuples '''
+
+  counts = [-(-n // c) for n, c in zip(shape, chunks)]
+  for c in itertools.product(*[range(k) for k in counts]):
+    yield c, tuple(slice(i*s, min((i+1)*s, n)) for i, s, n in zip(c, chunks, shape))
+
+
+def write_grid(store_dir, index, coord):
+  ''' save the grid information, in the format of `Snapshot.index` and `Snapshot.coord` '''
+
+  arrays = {f'index.{key}': np.asarray(value) for key, value in index.items()}
+  arrays.update({f'coord.{key}': np.asarray(getattr(value, 'value', value)) for key, value in coord.items()})
+  tmp = store_dir + f'.grid.{os.getpid()}.tmp.npz'
+  np.savez(tmp, **arrays)
+  os.replace(tmp, store_dir + 'grid.npz')
+
+
+def read_grid(store_dir):
+  ''' read the grid information saved by write_grid()
+
+  Returns:
+    tuple: (index, coord), two dicts in the format of `Snapshot.index` and `Snapshot.coord`
+  '''
+
+  index = {}
+  coord = {}
+  with np.load(store_dir + 'grid.npz') as f:
+    for key in f.files:
+      group, name = key.split('.', 1)
+      if group == 'index':
+        index[name] = int(f[key])
+      else:
+        coord[name] = f[key]
+  return index, coord
+
+
+def write_output(store_dir, meta, snapshot):
+  ''' write the fields of a snapshot into the store, each file is written to a temporary file first
+
+  Args:
+    store_dir (str): directory of the store
+    meta (dict): layout of the store, i.e. contents of index.json
+    snapshot (Snapshot): snapshot in code units
+  '''
+
+  dtype = np.dtype(meta['dtype'])
+  shape = tuple(meta['shape'])
+  chunks = tuple(meta['chunks'])
+  ns = snapshot.nstep
+  if meta['format'] == 'hdf5':
+    import h5py
+    tmp = store_dir + f'.data.{ns:04d}.{os.getpid()}.tmp'
+    with h5py.File(tmp, 'w') as f:
+      for name in meta['fields']:
+        dset = f.create_dataset(name, shape=shape, dtype=dtype, chunks=chunks, compression='gzip', shuffle=True)
+        for c, index in _chunk_grid(shape, chunks):
+          dset[index] = snapshot.fields.region(name, index)
+    os.replace(tmp, store_dir + f'data.{ns:04d}.h5')
+    return
+
+  for name in meta['fields']:
+    tmp = store_dir + f'.{name}.{ns:04d}.{os.getpid()}.tmp'
+    with zipfile.ZipFile(tmp, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+      for c, index in _chunk_grid(shape, chunks):
+        with zf.open(_chunk_key(c) + '.npy', 'w', force_zip64=True) as f:
+          np.lib.format.write_array(f, np.asarray(snapshot.fields.region(name, index), dtype=dtype))
+    os.replace(tmp, store_dir + f'{name}.{ns:04d}.npz')
+
+
+class StoreReader(object):
+  ''' Reader for outputs converted by `Dataset.convert()`, i.e. chunked and compressed arrays of each field
+
+  Args:
+    ns (int): number of the output file
+    dataset (Dataset): provides `output_dir` and `field_list`
+    index (dict): number of cells in each direction, in the format of `Snapshot.index` (not used, \
+        the shape is recorded in the store)
+
+  Attributes:
+    shape (tuple): shape of each variable, that of `Grid` arrays
+    chunks (tuple): shape of chunks
+    dtype (numpy.dtype): data type
+
+  Methods:
+    read(name, index=None):
+    release(name=None):
+    filename(name):
+    complete():
+  '''
+
+  __slots__ = [
+    'ns',
+    'store_dir',
+    'format',
+    'field_list',
+    'shape',
+    'chunks',
+    'dtype',
+    '_files'
+  ]
+
+  datatype = 'store'
+
+  def __init__(self, ns, dataset, index=None):
+    self.ns = ns
+    self.store_dir = dataset.output_dir + 'store/'
+    with open(self.store_dir + 'index.json', 'r') as f:
+      meta = json.load(f)
+    self.format = meta['format']
+    self.field_list = dataset.field_list
+    self.shape = tuple(meta['shape'])
+    self.chunks = tuple(meta['chunks'])
+    self.dtype = np.dtype(meta['dtype'])
+    self._files = {}
+
+  def filename(self, name):
+    ''' return the file where the variable `name` is stored '''
+
+    if self.format == 'hdf5':
+      return self.store_dir + f'data.{self.ns:04d}.h5'
+    return self.store_dir + f'{name}.{self.ns:04d}.npz'
+
+  def complete(self):
+    ''' whether the files are written, they are renamed into place when complete '''
+
+    return all(os.path.exists(self.filename(name)) for name in self.field_list)
+
+  def _open(self, name):
+    path = self.filename(name)
+    if path not in self._files:
+      if self.format == 'hdf5':
+        import h5py
+        self._files[path] = h5py.File(path, 'r')
+      else:
+        self._files[path] = np.load(path)
+    return self._files[path]
+
+  def read(self, name, index=None):
+    ''' read a variable
+
+    Args:
+      name (str): variable name listed in `field_list`
+      index (tuple): if given, only the region is read, which costs the chunks overlapping it. (optional)
+
+    Returns:
+      numpy.ndarray: in the shape of `Grid` arrays, or of the region if `index` is given
+    '''
+
+    if name not in self.field_list:
+      raise KeyError(f'The field {name} is not stored in output {self.ns}.')
+    index = () if index is None else index
+    index = tuple(index) + (slice(None),)*(len(self.shape)-len(index))
+
+    # bounding box of the region and the index relative to it
+    lo, hi, sub = [], [], []
+    for i, n in zip(index, self.shape):
+      if isinstance(i, slice):
+        r = range(*i.indices(n))
+        if len(r) == 0:
+          return self.read(name)[index]
+        a, b = min(r[0], r[-1]), max(r[0], r[-1]) + 1
+        stop = r.stop - a
+        sub.append(slice(r.start - a, stop if stop >= 0 else None, r.step))
+      elif isinstance(i, (int, np.integer)):
+        a = int(i) + n if i < 0 else int(i)
+        b = a + 1
+        sub.append(0)
+      else:  # e.g. boolean or integer arrays
+        return self.read(name)[index]
+      lo.append(a)
+      hi.append(b)
+
+    f = self._open(name)
+    if self.format == 'hdf5':
+      return np.asarray(f[name][tuple(slice(a, b) for a, b in zip(lo, hi))])[tuple(sub)]
+
+    block = np.empty(tuple(b - a for a, b in zip(lo, hi)), dtype=self.dtype)
+    ranges = [range(a // c, (b - 1) // c + 1) for a, b, c in zip(lo, hi, self.chunks)]
+    for c in itertools.product(*ranges):
+      chunk = f[_chunk_key(c)]
+      start = [i*s for i, s in zip(c, self.chunks)]
+      src = tuple(slice(max(a, s) - s, min(b, s + n) - s) for a, b, s, n in zip(lo, hi, start, chunk.shape))
+      dst = tuple(slice(max(a, s) - a, min(b, s + n) - a) for a, b, s, n in zip(lo, hi, start, chunk.shape))
+      block[dst] = chunk[src]
+    return block[tuple(sub)]
+
+  def release(self, name=None):
+    ''' close the files of a variable, or all of them if `name` is None '''
+
+    paths = list(self._files) if name is None else [self.filename(name)]
+    for path in paths:
+      f = self._files.pop(path, None)
+      if f is not None:
+        f.close()
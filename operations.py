@@ -1,30 +1,26 @@
 from .data_structs.dataset import Snapshot
 
 
-def to_cartesian(data):
+def to_cartesian(data, vectors=None):
   ''' convert to cartesian coordinate system
 
   Currently only support converting:
     grids['x1']
     grids['x2']
     grids['x3']
-    fields['vx1']
-    fields['vx2']
-    fields['vx3']
+    vector fields, e.g. fields['vx1'], fields['vx2'], fields['vx3']
 
   Args:
     data (Snapshot): data needed to be converted geometry
+    vectors (list): triples of names of vector fields. \
+        Default is None, velocity and magnetic field if they are in `field_list`.
 
   Returns:
-    Snapshot: new Snapshot is as the same as the older one,
-              except for grids and velocity arrays have been transformed to cartesian system
+    CartesianView: view of the snapshot, in which grids and vector fields are transformed to cartesian system, \
+        the original snapshot is not changed
   '''
 
-  ds = data
-  ds.grids['x1'], ds.grids['x2'], ds.grids['x3'] = data.grids.to_cartesian()
-  ds.fields['vx1'], ds.fields['vx2'], ds.fields['vx3'] = data.fields.to_cartesian()
-
-  return ds
+  return data.cartesian(vectors)
 
 
 def slice2d(data, x1=None, x2=None, x3=None):
@@ -43,7 +39,7 @@ def slice2d(data, x1=None, x2=None, x3=None):
     raise TypeError(f'The input data is a {type(data)}, it should be Snapshot class!')
 
   for var in data.field_list:
-    data.fields[var] = data.slice2d(var, x1=x1, x2=x3, x3=x3)
+    data.fields[var] = data.slice2d('fields', var, x1=x1, x2=x2, x3=x3)
 
 
 def slice1d(data, x1=None, x2=None, x3=None):
@@ -62,4 +58,4 @@ def slice1d(data, x1=None, x2=None, x3=None):
     raise TypeError('The input data should be Snapshot class!')
 
   for var in data.field_list:
-    data.fields[var] = data.slice1d(var, x1=x1, x2=x3, x3=x3)
+    data.fields[var] = data.slice1d('fields', var, x1=x1, x2=x2, x3=x3)
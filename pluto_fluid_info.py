@@ -1,5 +1,4 @@
-import numpy as np
-import astropy.units as u
+from .data_structs.expression import Expression
 
 
 def setup(cls):
@@ -26,6 +25,12 @@ class PlutoFluidInfo(object):
     'phi'       :('scalar', None, 'code_velocity**2',   'km**2/s**2',  ['potential'  ]),
   }
 
+  # input fields of derived fields, None if they are not declared
+  dependencies = {}
+
+  # derived fields whose values in a cell only depend on the same cell, so they can be computed block by block
+  blockwise = set()
+
   @classmethod
   def type(cls, field):
     return cls.known_fields[field][0]
@@ -42,6 +47,43 @@ class PlutoFluidInfo(object):
   def astro_unit(cls, field):
     return cls.known_fields[field][3]
 
+  @classmethod
+  def depends(cls, field):
+    ''' input fields of a field, [] for primal fields and None if not declared '''
+
+    if field in cls.known_fields and cls.known_fields[field][1] is None:
+      return []
+    return cls.dependencies.get(field)
+
+  @classmethod
+  def is_blockwise(cls, field):
+    return field in cls.blockwise
+
+  @classmethod
+  def plan(cls, fields):
+    ''' evaluation order of fields, in which every field comes after its inputs
+
+    Args:
+      fields (list): requested field names
+
+    Returns:
+      list: requested fields and all their inputs in dependency order
+    '''
+
+    order = []
+    def visit(name, path):
+      if name in order:
+        return
+      if name in path:
+        raise ValueError(f'Circular dependency of derived fields: {path + [name]}.')
+      for dep in cls.depends(name) or []:
+        visit(dep, path + [name])
+      order.append(name)
+
+    for name in fields:
+      visit(name, [])
+    return order
+
   @classmethod
   def show(cls):
     print(f'Field Name \t Unit       \t Alias')
@@ -59,32 +101,62 @@ class PlutoFluidInfo(object):
 
   @classmethod
   def add_field(cls, name, type, **kwargs):
+    ''' register a derived field, used as a decorator if neither `function` nor `expression` is given
+
+    Args:
+      name (str): field name
+      type (str): 'scalar' or 'vector'
+      function (callable): computes the field from a snapshot. (optional)
+      expression (str): arithmetic expression of other fields, e.g. 'sqrt(vx1*vx1 + vx2*vx2)', \
+          whose inputs are found automatically. (optional)
+      code_unit, astro_unit (str): units of the field. (optional)
+      alias (list): other names of the field. (optional)
+      depends (list): input fields of `function`. Default is None, all primal fields.
+      blockwise (bool): whether `function` only combines values in the same cells, \
+          so it can be computed block by block. Default is False, always True for expressions.
+    '''
+
     function = kwargs.get('function')
     code_unit = kwargs.get('code_unit')
     astro_unit = kwargs.get('astro_unit')
     alias = kwargs.get('alias')
+    depends = kwargs.get('depends')
+    expression = kwargs.get('expression')
+    blockwise = kwargs.get('blockwise', False)
+    if expression is not None:
+      function = Expression(expression)
+      blockwise = True
+      if depends is None:
+        depends = function.fields
     if function is None:
       def create_function(f):
         lst = (type, f, code_unit, astro_unit, alias)
         cls.known_fields[name] = lst
+        cls.dependencies[name] = depends
+        cls._set_blockwise(name, blockwise)
         return f
       return create_function
 
     else:
       lst = (type, function, code_unit, astro_unit, alias)
       cls.known_fields[name] = lst
+      cls.dependencies[name] = depends
+      cls._set_blockwise(name, blockwise)
+
+  @classmethod
+  def _set_blockwise(cls, name, blockwise):
+    if blockwise:
+      cls.blockwise.add(name)
+    else:
+      cls.blockwise.discard(name)
 
   @classmethod
   def setup_derived_field(cls):
 # Below predefine some in-built derived field functions
-    def _speed(data):
-      mod = data.fields['vx1']*data.fields['vx1'] + data.fields['vx2']*data.fields['vx2'] + data.fields['vx3']*data.fields['vx3']
-      return np.sqrt(mod)
-
     cls.add_field(
       name ='speed',
       type = 'scalar',
-      function=_speed,
+      expression='sqrt(vx1*vx1 + vx2*vx2 + vx3*vx3)',
       code_unit='code_velocity',
       astro_unit='km/s',
       alias=['speed']
@@ -95,7 +167,7 @@ class PlutoFluidInfo(object):
 add_field = PlutoFluidInfo.add_field
 
 def derived_field(name, type, **kwargs):
-  return add_field(name, type, kwargs)
+  return add_field(name, type, **kwargs)
 
 
 class field_register(object):
@@ -1,9 +1,16 @@
+import io
 import os
+import shlex
+import tempfile
+import subprocess
 import fire
 import numpy as np
-import pandas as pd
 import matplotlib as mpl
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from mpl_toolkits.axes_grid1 import make_axes_locatable
 from astropy.visualization import quantity_support
 quantity_support()
@@ -11,9 +18,208 @@ quantity_support()
 from PLUTOpy.pluto_def_constants import PlutoDefConstants
 from PLUTOpy.pluto_fluid_info import PlutoFluidInfo
 from PLUTOpy.data_structs.dataset import Dataset, Snapshot
+from PLUTOpy.data_structs.reader import HistoryLog
 from PLUTOpy.operations import to_cartesian, slice2d, slice1d
 
 
+def _plane_view(ss):
+  return ss if ss.geometry == 'CARTESIAN' else to_cartesian(ss)
+
+
+def _plane_coords(ss, plane):
+  ''' cartesian coordinates (x, y) of the plane to be displayed, as raw arrays
+
+  Args:
+    ss (Snapshot): snapshot
+    plane (dict): rough coordinate of the plane in 3-D data, e.g. {'x1': None, 'x2': None, 'x3': 0.1}
+  '''
+
+  ss = _plane_view(ss)
+  if ss.ndim == 3:
+    label = [dim for dim in ['x1', 'x2', 'x3'] if plane.get(dim) is None]
+    x = ss.slice2d('grids', label[0], **plane)
+    y = ss.slice2d('grids', label[1], **plane)
+  else:
+    # the (x, z) plane for spherical data, otherwise the plane of the two axes
+    label = ['x1', 'x3'] if ss.geometry == 'SPHERICAL' else ss.grids.axes
+    x = ss.grids[label[0]]
+    y = ss.grids[label[1]]
+  return np.asarray(getattr(x, 'value', x)), np.asarray(getattr(y, 'value', y))
+
+
+def _plane_values(ss, field, plane):
+  ''' raw array of a field in the plane to be displayed, only the plane is read from disk '''
+
+  ss = _plane_view(ss)
+  if ss.ndim == 3:
+    arr = ss.slice2d('fields', field, **plane)
+  else:
+    arr = ss.fields[field]
+  return np.asarray(getattr(arr, 'value', arr))
+
+
+def _uniform(x):
+  ''' whether 1-D coordinates are evenly spaced '''
+
+  dx = np.diff(np.asarray(getattr(x, 'value', x), dtype=float))
+  return len(dx) == 0 or np.allclose(dx, dx[0], rtol=1e-6, atol=0)
+
+
+class _PlanePlot(object):
+  ''' Plot of a field in a plane, whose axes, image (or mesh) and colorbar are created once and reused
+
+  Args:
+    fig (Figure): figure to draw in
+
+  Methods:
+    draw(ss, field, plane, log=True, title=None, **style):
+  '''
+
+  __slots__ = ['fig', 'key', 'ax', 'artist', 'cbar', 'title']
+
+  def __init__(self, fig):
+    self.fig = fig
+    self.key = None
+    self.ax = None
+    self.artist = None
+    self.cbar = None
+    self.title = None
+
+  @staticmethod
+  def _image(ss, field, plane, regrid=None, method='nearest'):
+    ''' array of the plane as an image (rows along y) and its extent, or None if it is not on a uniform grid '''
+
+    if regrid is not None and ss.geometry != 'CARTESIAN':
+      r = ss.regridder(regrid, method=method, **plane)
+      if len(r.shape) != 2:
+        raise ValueError('The plane of 3-D data should be specified by one of x1, x2 and x3.')
+      arr = r(_plane_view(ss), field)
+      return np.asarray(getattr(arr, 'value', arr)).T, [e for ext in r.extent for e in ext]
+
+    if ss.geometry != 'CARTESIAN':
+      return None
+    label = [dim for dim in ss.grids.axes if plane.get(dim) is None] if ss.ndim == 3 else ss.grids.axes
+    edges = [getattr(ss.coord[dim+'r'], 'value', ss.coord[dim+'r']) for dim in label]
+    if not all(_uniform(ss.coord[dim]) for dim in label):
+      return None
+    arr = _plane_values(ss, field, plane)
+    return arr.T, [float(edges[0][0]), float(edges[0][-1]), float(edges[1][0]), float(edges[1][-1])]
+
+  def draw(self, ss, field, plane, log=True, title=None, **style):
+    ''' draw a field of a snapshot
+
+    Args:
+      ss (Snapshot): snapshot
+      field (str): field name
+      plane (dict): rough coordinate of the plane in 3-D data, e.g. {'x1': None, 'x2': None, 'x3': 0.1}
+      log (bool): whether in log scale. Default is True.
+      title (str): title of the plot. Default is None, 't = time'.
+
+    **style:
+      vmin, vmax (float): limits of the colorbar, (Default : limits of the array)
+      cmap (str): color scheme of the colorbar
+      size (float): fontsize of title
+      regrid (int): number of pixels along the longest side to resample curvilinear data onto. \
+          Default is None, drawn on the original mesh.
+      method (str): 'nearest' or 'linear' for resampling. Default is 'nearest'.
+    '''
+
+    image = self._image(ss, field, plane, style.get('regrid'), style.get('method', 'nearest'))
+    arr = _plane_values(ss, field, plane) if image is None else image[0]
+    key = (ss.output_dir, ss.geometry, ss.with_units, tuple(sorted(plane.items())), \
+        style.get('regrid'), style.get('method'), image is None, arr.shape, style.get('cmap'), style.get('size'))
+
+    if key != self.key:
+      self.fig.clear()
+      self.ax = self.fig.add_subplot(111)
+      self.ax.set_aspect('equal')
+      norm = mpl.colors.LogNorm() if log else mpl.colors.Normalize()
+      if image is None:
+        x, y = _plane_coords(ss, plane)
+        self.ax.axis([np.amin(x),np.amax(x),np.amin(y),np.amax(y)])
+        self.artist = self.ax.pcolormesh(x, y, arr, cmap=style.get('cmap'), shading='auto', norm=norm)
+      else:
+        self.artist = self.ax.imshow(arr, origin='lower', extent=image[1], interpolation='nearest', \
+            cmap=style.get('cmap'), norm=norm)
+      # Add a new axes beside the plot to present colorbar
+      cax = make_axes_locatable(self.ax).append_axes('right', size='5%', pad=0.0)
+      self.cbar = self.fig.colorbar(self.artist, cax=cax, orientation='vertical')
+      self.title = self.ax.set_title('', size=style.get('size'))
+      self.key = key
+    elif image is None:
+      self.artist.set_array(arr)
+    else:
+      self.artist.set_data(arr)
+
+    # the color scale follows the array unless it is given, the colorbar follows the norm
+    if isinstance(self.artist.norm, mpl.colors.LogNorm) != log:
+      self.artist.norm = mpl.colors.LogNorm() if log else mpl.colors.Normalize()
+    self.artist.norm.vmin = None
+    self.artist.norm.vmax = None
+    self.artist.set_clim(style.get('vmin'), style.get('vmax'))
+    self.artist.autoscale_None()
+    label = PlutoFluidInfo.known_fields.get(field)[-1][0]
+    self.cbar.ax.set_ylabel(r'$\log\;$'+label if log else label)
+    self.title.set_text(f't = {ss.time:.3e}' if title is None else title)
+    return self
+
+
+class _FrameRenderer(object):
+  ''' Render frames of a field with a single figure, whose artists are updated in place
+
+  Args:
+    dataset (tuple): arguments of Dataset, (code_dir, init_file, datatype, with_units)
+    field (str): field name
+    plane (tuple): rough coordinates of the plane (x1, x2, x3)
+    log (bool): whether in log scale
+    style (tuple): items of keyword arguments, i.e. vmin, vmax, cmap, title, size, dpi, regrid and method
+  '''
+
+  def __init__(self, dataset, field, plane, log, style):
+    code_dir, init_file, datatype, with_units = dataset
+    self.dataset = Dataset(code_dir=code_dir, init_file=init_file, datatype=datatype, with_units=with_units, lazy=True)
+    self.field = field
+    self.plane = dict(zip(['x1', 'x2', 'x3'], plane))
+    self.log = log
+    self.style = dict(style)
+    self.fig = Figure(figsize=(5,4), tight_layout=True)
+    FigureCanvasAgg(self.fig)
+    self.plot = _PlanePlot(self.fig)
+
+  def update(self, ns):
+    ''' draw the snapshot `ns`, the artists are created for the first frame and only their data are updated later '''
+
+    ss = self.dataset[ns]
+    style = {key: value for key, value in self.style.items() if key not in ['title', 'dpi']}
+    title = self.style.get('title', 't = {time:.3e}').format(time=ss.time, ns=ss.nstep)
+    self.plot.draw(ss, self.field, self.plane, self.log, title, **style)
+
+  def render(self, numbers, names=None):
+    ''' render frames, saved to files if `names` are given, otherwise returned as PNG bytes '''
+
+    frames = []
+    for i, ns in enumerate(numbers):
+      self.update(ns)
+      if names is None:
+        buf = io.BytesIO()
+        self.fig.savefig(buf, format='png', dpi=self.style.get('dpi', 150))
+        frames.append(buf.getvalue())
+      else:
+        self.fig.savefig(names[i], dpi=self.style.get('dpi', 150))
+        frames.append(names[i])
+    return frames
+
+
+# renderers of worker processes, reused by the chunks of frames rendered by the same process
+_worker_renderers = {}
+
+def _render_worker(task):
+  args, numbers, names = task
+  if args not in _worker_renderers:
+    _worker_renderers[args] = _FrameRenderer(*args)
+  return _worker_renderers[args].render(numbers, names)
+
+
 class Preview(object):
   ''' Class for previewing data results.
 
@@ -33,7 +239,20 @@ class Preview(object):
     self.with_units = with_units
 
     self.fig = plt.figure(figsize=(5,4), tight_layout=True)
+    self._plot = _PlanePlot(self.fig)
+    self._datasets = {}
+    self._hists = {}
+
 
+  def _dataset(self, kwargs):
+    ''' Dataset parsed once and reused by later calls with the same arguments '''
+
+    args = tuple(kwargs.get(key, getattr(self, key)) for key in ['code_dir', 'init_file', 'datatype', 'with_units'])
+    if args not in self._datasets:
+      self._datasets[args] = Dataset(code_dir=args[0], init_file=args[1], datatype=args[2], with_units=args[3], lazy=True)
+    ds = self._datasets[args]
+    self.output_dir = ds.output_dir
+    return ds
 
   def show(self):
     ''' show figure in prompt window '''
@@ -61,7 +280,7 @@ class Preview(object):
 
 
   def display(self, ns, field, x1=None, x2=None, x3=None, log=True, **kwargs):
-    ''' Display a 2D data using the matplotlib's pcolormesh
+    ''' Display a 2D data using the matplotlib's pcolormesh, or imshow for uniform grids
 
     Args:
       ns (int/float): should be a integer in default, \
@@ -80,59 +299,19 @@ class Preview(object):
       cmap (str): color scheme of the colorbar
       title (str): Sets the title of the image.
       size (float): fontsize of title
+      regrid (int): number of pixels along the longest side to resample curvilinear data onto, \
+          and display by imshow. Default is None, displayed on the original mesh.
+      method (str): 'nearest' or 'linear' for resampling. Default is 'nearest'.
     '''
 
-    ds = Dataset(code_dir=kwargs.get('code_dir', self.code_dir), init_file=kwargs.get('init_file', self.init_file), datatype=kwargs.get('datatype', self.datatype), with_units=kwargs.get('with_units', self.with_units))
-    self.output_dir = ds.output_dir
-    ss = ds[ns]
+    ss = self._dataset(kwargs)[ns]
     self.field = field
     self.index = ss.nstep
 
-    if ss.geometry != 'CARTESIAN':
-      ss = to_cartesian(ss)
-
-    offset = [x1,x2,x3]
-    label = ['x1','x2','x3']
-
-    if ss.ndim==3:
-      arr = ss.slice2d('fields', field, x1=x1, x2=x2, x3=x3)
-      for i in range(3):  # find the dirction
-        if offset[i] is not None:
-          dim = 'x'+str(i+1)
-          label.remove(dim)
-          break
-      x = ss.slice2d('grids', label[0], x1=x1, x2=x2, x3=x3)
-      y = ss.slice2d('grids', label[1], x1=x1, x2=x2, x3=x3)
-    elif ss.ndim==2:
-      arr = ss.fields[field]
-      x = ss.grids['x1']
-      y = ss.grids['x3']
-
-    ax1 = self.fig.add_subplot(111)
-    ax1.set_aspect('equal')
-    if ss.with_units:  # pcolormesh does not support Quantity
-      x = x.value
-      y = y.value
-      arr = arr.value
-    ax1.axis([np.amin(x),np.amax(x),np.amin(y),np.amax(y)])
-    if log:
-      pcm = ax1.pcolormesh(x,y,arr,\
-        cmap=kwargs.get('cmap'), shading='auto', norm=mpl.colors.LogNorm(vmin=kwargs.get('vmin'),vmax=kwargs.get('vmax')))
-    else:
-      pcm = ax1.pcolormesh(x,y,arr,vmin=kwargs.get('vmin'),vmax=kwargs.get('vmax'), \
-        cmap=kwargs.get('cmap'), shading='auto')
-
-    plt.title(kwargs.get('title',f't = {ss.time:.3e}'),size=kwargs.get('size'))
-
-    # Add a new axes beside the plot to present colorbar
-    divider = make_axes_locatable(ax1)
-    cax = divider.append_axes('right', size='5%', pad=0.0)
-    cb = plt.colorbar(pcm, cax=cax,orientation='vertical')
-    defined_fields = PlutoFluidInfo.known_fields
-    if log:
-      cb.ax.set_ylabel(r'$\log\;$'+defined_fields.get(field)[-1][0])
-    else:
-      cb.ax.set_ylabel(defined_fields.get(field)[-1][0])
+    plane = {'x1': x1, 'x2': x2, 'x3': x3}
+    style = {key: kwargs[key] for key in ['vmin', 'vmax', 'cmap', 'size', 'regrid', 'method'] if kwargs.get(key) is not None}
+    self._plot.draw(ss, field, plane, log, kwargs.get('title'), **style)
+    self.fig.canvas.draw_idle()
 
     return self
 
@@ -156,9 +335,7 @@ class Preview(object):
       ylog (bool): set x-axis in log scale
     '''
 
-    ds = Dataset(code_dir=kwargs.get('code_dir', self.code_dir), init_file=kwargs.get('init_file', self.init_file), datatype=kwargs.get('datatype', self.datatype), with_units=kwargs.get('with_units', self.with_units))
-    self.output_dir = ds.output_dir
-    ss = ds[ns]
+    ss = self._dataset(kwargs)[ns]
     self.field = field
     self.index = ss.nstep
     indx = [x1,x2,x3]
@@ -183,11 +360,200 @@ class Preview(object):
     return self
 
 
-  def hist(self, *var, file_name='hist.out', operate=None, **kwargs):  # in construction
-    ''' Preview temperal evolution stored in hist.out file '''
+  def _frames(self, field, start, stop, step, plane, log, workers, chunk, kwargs, names=None):
+    ''' prepare rendering and return the generator of rendered frames in order, refer to frames() '''
+
+    ds = Dataset(code_dir=self.code_dir, init_file=self.init_file, datatype=self.datatype, with_units=self.with_units, lazy=True)
+    self.output_dir = ds.output_dir
+    self.field = field
+    available = set(ds._log.nfile.tolist())
+    stop = max(available) + 1 if stop is None else stop
+    numbers = [ns for ns in range(start, stop, step) if ns in available]
+    if len(numbers) == 0:
+      return iter([])
+
+    # the color scale is fixed by the first frame, so that it is the same in all workers
+    style = {key: kwargs[key] for key in ['vmin', 'vmax', 'cmap', 'title', 'size', 'dpi', 'regrid', 'method'] if kwargs.get(key) is not None}
+    if 'vmin' not in style or 'vmax' not in style:
+      arr = _plane_values(ds[numbers[0]], field, plane)
+      arr = arr[np.isfinite(arr) & (arr > 0)] if log else arr[np.isfinite(arr)]
+      style.setdefault('vmin', float(np.min(arr)))
+      style.setdefault('vmax', float(np.max(arr)))
+
+    args = ((self.code_dir, self.init_file, self.datatype, self.with_units), field, \
+        (plane['x1'], plane['x2'], plane['x3']), log, tuple(sorted(style.items())))
+    names = [None]*len(numbers) if names is None else names(numbers)
+    tasks = [(args, numbers[k:k+chunk], None if names[k] is None else names[k:k+chunk]) for k in range(0, len(numbers), chunk)]
+    return self._render(tasks, workers)
+
+  @staticmethod
+  def _render(tasks, workers):
+    if workers is not None and workers <= 1:
+      renderer = _FrameRenderer(*tasks[0][0])
+      for task in tasks:
+        yield from renderer.render(*task[1:])
+      return
+
+    workers = os.cpu_count() if workers is None else workers
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+      futures = deque()
+      for task in tasks:
+        futures.append(executor.submit(_render_worker, task))
+        if len(futures) > 2*workers:  # bounded number of rendered frames waiting in memory
+          yield from futures.popleft().result()
+      while futures:
+        yield from futures.popleft().result()
+
+
+  def frames(self, field, start=0, stop=None, step=1, x1=None, x2=None, x3=None, log=True, path=None, workers=None, chunk=8, **kwargs):
+    ''' Render the snapshots in a range into numbered images, in parallel worker processes
+
+    Args:
+      field (str): variable that needs to be displayed
+      start (int): number of the first snapshot. Default is 0.
+      stop (int): number after the last snapshot. Default is None, till the last snapshot.
+      step (int): step of snapshot numbers. Default is 1.
+      x1, x2, x3 (float): (optional) rough coordinate of the plane in 3-D data, refer to display()
+      log (bool): whether in log scale. Default is True.
+      path (str): directory of images named like "rho0001-model.png". Default is the output directory.
+      workers (int): number of worker processes. Default is None, the number of CPUs. \
+          If it is 1, frames are rendered in this process.
+      chunk (int): number of frames rendered by a worker at a time. Default is 8.
+
+    **kwargs:
+      vmin (float): minimum of the colorbar of all frames (Default : min of the first frame)
+      vmax (float): maximum of the colorbar of all frames (Default : max of the first frame)
+      cmap (str): color scheme of the colorbar
+      title (str): format of the title with `time` and `ns`. Default is 't = {time:.3e}'.
+      size (float): fontsize of title
+      regrid (int): number of pixels to resample curvilinear data onto, refer to display()
+      method (str): 'nearest' or 'linear' for resampling. Default is 'nearest'.
+      dpi (int): resolution of images. Default is 150.
+      format (str): format of images. Default is 'png'.
+    '''
+
+    plane = {'x1': x1, 'x2': x2, 'x3': x3}
+    fmt = kwargs.get('format', 'png')
+    def names(numbers):
+      folder = self.output_dir if path is None else os.path.abspath(path)+'/'
+      os.makedirs(folder, exist_ok=True)
+      model = self.code_dir.split('/')[-2]
+      return [folder+f'{field}{ns:04d}-{model}.{fmt}' for ns in numbers]
+
+    self.files = list(self._frames(field, start, stop, step, plane, log, workers, chunk, kwargs, names))
+    return self
+
+
+  def movie(self, field, output=None, fps=24, encoder=None, start=0, stop=None, step=1, x1=None, x2=None, x3=None, log=True, workers=None, chunk=8, **kwargs):
+    ''' Render the snapshots in a range into a movie, frames are piped to the encoder without intermediate files
+
+    Args:
+      field (str): variable that needs to be displayed
+      output (str): file of the movie. Default is "field-model.mp4" in the output directory.
+      fps (int): frames per second. Default is 24.
+      encoder (str): command of the encoder reading PNG frames from stdin, \
+          where {fps} and {output} are replaced. Default is ffmpeg producing H.264 video.
+      Other arguments refer to frames()
+    '''
+
+    plane = {'x1': x1, 'x2': x2, 'x3': x3}
+    frames = self._frames(field, start, stop, step, plane, log, workers, chunk, kwargs)
+    if output is None:
+      model = self.code_dir.split('/')[-2]
+      output = self.output_dir+f'{field}-{model}.mp4'
+    if encoder is None:
+      encoder = 'ffmpeg -y -loglevel error -f image2pipe -framerate {fps} -i - ' \
+          '-vf pad=ceil(iw/2)*2:ceil(ih/2)*2 -pix_fmt yuv420p {output}'
+    cmd = shlex.split(encoder.format(fps=fps, output=shlex.quote(output)))
+
+    # errors of the encoder go to a file, a pipe could fill up and block it while frames are written
+    with tempfile.TemporaryFile() as stderr:
+      try:
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=stderr)
+      except FileNotFoundError as e:
+        raise FileNotFoundError(f'Encoder {cmd[0]} is not found. Install it, or render images by frames().') from e
+      broken = False
+      try:
+        for frame in frames:
+          proc.stdin.write(frame)
+      except BrokenPipeError:  # the encoder exited early, its error is reported below
+        broken = True
+      finally:
+        frames.close()
+        try:
+          proc.stdin.close()
+        except BrokenPipeError:
+          broken = True
+        proc.wait()
+      stderr.seek(0)
+      message = stderr.read().decode(errors='replace').strip()
+    if broken or proc.returncode != 0:
+      raise RuntimeError(f'Encoder exited with code {proc.returncode}: {message}')
+
+    self.files = [output]
+    return self
+
+
+  def watch(self, field, x1=None, x2=None, x3=None, log=True, start=None, interval=1.0, timeout=None, path=None, **kwargs):
+    ''' Follow a running simulation, displaying each new snapshot as soon as it is written, refer to Dataset.watch()
 
-    hist = pd.read_csv(self.code_dir+'hist.out', sep='\s+', index_col='t')
-    hist = hist[list(var)]
+    Args:
+      field (str): variable that needs to be displayed
+      x1, x2, x3 (float): (optional) rough coordinate of the plane in 3-D data, refer to display()
+      log (bool): whether in log scale. Default is True.
+      start (int): number of the first output to display. Default is None, only outputs written from now on.
+      interval (float): seconds between polls. Default is 1.0.
+      timeout (float): seconds without new outputs after which watching stops. Default is None, until interrupted.
+      path (str): directory of images named like "rho0001-model.png". Default is None, not saved.
+
+    **kwargs:
+      refer to display(), and format (str) of images. Default is 'png'.
+    '''
+
+    ds = self._dataset(kwargs)
+    self.files = []
+    if path is not None:
+      folder = os.path.abspath(path)+'/'
+      os.makedirs(folder, exist_ok=True)
+      model = self.code_dir.split('/')[-2]
+    for ss in ds.watch(start, interval, timeout):
+      self.display(ss.nstep, field, x1=x1, x2=x2, x3=x3, log=log, **kwargs)
+      if path is not None:
+        name = folder+f'{field}{ss.nstep:04d}-{model}.{kwargs.get("format", "png")}'
+        self.fig.savefig(name, dpi=kwargs.get('dpi', 150))
+        self.files.append(name)
+      plt.pause(0.001)  # shows the window of interactive backends
+    return self
+
+
+  def hist(self, *var, file_name='hist.out', operate=None, points=2000, **kwargs):
+    ''' Preview temperal evolution stored in hist.out file
+
+    Args:
+      var (str): names of columns to plot
+      file_name (str): history file, relative to the code directory. Default is 'hist.out'.
+      operate (str): None, 'diff' (difference from the first row) or 'norm' (ratio to the first row)
+      points (int): number of buckets, in each of which only the rows of minimum and maximum are plotted. \
+          Default is 2000. None means all rows.
+
+    **kwargs:
+      cache (bool): whether to cache the columns in binary files in .plutopy_cache. Default is True.
+      title (str): Sets the title of the plot.
+      size (float): fontsize of title and labels
+      label1 (str): label of x-axis
+      label2 (str): label of y-axis
+      xlog (bool): set x-axis in log scale
+      ylog (bool): set y-axis in log scale
+    '''
+
+    filename = os.path.join(self.code_dir, file_name)
+    key = (filename, kwargs.get('cache', True))
+    if key not in self._hists:
+      cache_dir = os.path.join(os.path.dirname(filename), '.plutopy_cache') if key[1] else None
+      self._hists[key] = HistoryLog(filename, cache_dir)
+    else:
+      self._hists[key].refresh()
+    hist = self._hists[key].frame(*var, points=points)
 
     if operate is None:
       ax = plt.plot(hist)
@@ -210,5 +576,6 @@ class Preview(object):
 
     return self
 
+
 if __name__ == '__main__':
   fire.Fire(Preview)
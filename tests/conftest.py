@@ -0,0 +1,86 @@
+import os
+import sys
+import importlib.util
+import numpy as np
+import pytest
+from astropy.units import core as units_core
+
+os.environ.setdefault('MPLBACKEND', 'Agg')  # headless rendering
+
+# import the repository as the PLUTOpy package, whatever the name of its directory
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if 'PLUTOpy' not in sys.modules:
+  spec = importlib.util.spec_from_file_location('PLUTOpy', os.path.join(ROOT, '__init__.py'), submodule_search_locations=[ROOT])
+  module = importlib.util.module_from_spec(spec)
+  sys.modules['PLUTOpy'] = module
+  spec.loader.exec_module(module)
+
+
+FIELDS = ['rho', 'vx1', 'vx2', 'vx3', 'prs']
+
+LIMITS = {
+  'CARTESIAN': [(-1, 1), (-1, 1), (-1, 1)],
+  'POLAR': [(0.1, 1.0), (0, 2*np.pi), (-1, 1)],
+  'SPHERICAL': [(0.1, 1.0), (0.1, np.pi-0.1), (0, 2*np.pi)],
+}
+
+
+def values(ns, k, shape):
+  ''' values of the k-th variable of output ns written by make_run() '''
+
+  return np.fromfunction(lambda i, j, l: 1 + ns + (k+1)*(i + 0.1*j + 0.01*l), shape)
+
+
+def make_run(path, geometry='SPHERICAL', shape=(8, 6, 4), nout=3, filetype='single_file', datatype='dbl', \
+    endianess='little', unit_length='(CONST_pc*1.e3)'):
+  ''' write a synthetic PLUTO run: pluto.ini, definitions.h, grid.out, the log and data files
+
+  Returns:
+    str: code directory of the run
+  '''
+
+  code_dir = str(path) + '/'
+  out = code_dir + 'out/'
+  os.makedirs(out, exist_ok=True)
+  ndim = sum(1 for n in shape if n > 1)
+  with open(code_dir+'pluto.ini', 'w') as f:
+    f.write('[Static Grid Output]\n\noutput_dir    ./out\n')
+  with open(code_dir+'definitions.h', 'w') as f:
+    f.write(f'#define  PHYSICS                        HD\n#define  DIMENSIONS                     {ndim}\n'
+        f'#define  GEOMETRY                       {geometry}\n#define  UNIT_DENSITY     (CONST_mp*0.1)\n'
+        f'#define  UNIT_LENGTH      {unit_length}\n#define  UNIT_VELOCITY    1.e8\n')
+  with open(out+'grid.out', 'w') as g:
+    g.write(f'# ****\n# GEOMETRY:   {geometry}\n# ****\n')
+    for n, (a, b) in zip(shape, LIMITS[geometry]):
+      edges = np.linspace(a, b, n+1) if n > 1 else np.array([0., 1.])
+      g.write(f'{n}\n')
+      for i in range(n):
+        g.write(f' {i+1}  {edges[i]:.12e}  {edges[i+1]:.12e}\n')
+
+  dtype = ('<' if endianess == 'little' else '>') + ('f8' if datatype == 'dbl' else 'f4')
+  with open(out+f'{datatype}.out', 'w') as log:
+    for ns in range(nout):
+      log.write(f'{ns} {ns*0.5:.6e} 1.000000e-03 {ns*100} {filetype} {endianess} '+' '.join(FIELDS)+'\n')
+      data = [values(ns, k, shape).astype(dtype).tobytes(order='F') for k in range(len(FIELDS))]
+      if filetype == 'single_file':
+        with open(out+f'data.{ns:04d}.{datatype}', 'wb') as f:
+          f.write(b''.join(data))
+      else:
+        for name, d in zip(FIELDS, data):
+          with open(out+f'{name}.{ns:04d}.{datatype}', 'wb') as f:
+            f.write(d)
+  return code_dir
+
+
+@pytest.fixture(autouse=True)
+def unit_registry():
+  ''' each Dataset enables its code units globally, drop them so runs with other units can be opened later '''
+
+  depth = len(units_core._unit_registries)
+  yield
+  del units_core._unit_registries[depth:]
+
+
+@pytest.fixture
+def spherical(tmp_path):
+  return make_run(tmp_path)
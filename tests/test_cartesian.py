@@ -0,0 +1,40 @@
+import numpy as np
+
+from PLUTOpy import Dataset, to_cartesian
+from conftest import make_run
+
+
+def test_spherical_view_leaves_snapshot_untouched(spherical):
+  snapshot = Dataset(spherical)[1]
+  r, theta, phi = (np.array(snapshot.grids[key]) for key in ['x1', 'x2', 'x3'])
+  v = [np.array(snapshot.fields[key]) for key in ['vx1', 'vx2', 'vx3']]
+
+  view = to_cartesian(snapshot)
+  x, y, z = (np.asarray(view.grids[key]) for key in ['x1', 'x2', 'x3'])
+  np.testing.assert_allclose(x, r*np.sin(theta)*np.cos(phi), rtol=1e-12, atol=1e-14)
+  np.testing.assert_allclose(y, r*np.sin(theta)*np.sin(phi), rtol=1e-12, atol=1e-14)
+  np.testing.assert_allclose(z, r*np.cos(theta), rtol=1e-12, atol=1e-14)
+  vx = v[0]*np.sin(theta)*np.cos(phi) + v[1]*np.cos(theta)*np.cos(phi) - v[2]*np.sin(phi)
+  vz = v[0]*np.cos(theta) - v[1]*np.sin(theta)
+  np.testing.assert_allclose(view.fields['vx1'], vx, rtol=1e-12)
+  np.testing.assert_allclose(view.fields['vx3'], vz, rtol=1e-12, atol=1e-12)
+  index = (slice(2, 5), 3, slice(None))
+  np.testing.assert_allclose(view._region('fields', 'vx1', index), vx[index], rtol=1e-12)
+  np.testing.assert_allclose(view._region('grids', 'x2', index), y[index], rtol=1e-12, atol=1e-14)
+
+  # the snapshot keeps its spherical grids and fields
+  np.testing.assert_array_equal(snapshot.grids['x1'], r)
+  np.testing.assert_array_equal(snapshot.grids['x2'], theta)
+  np.testing.assert_array_equal(snapshot.fields['vx1'], v[0])
+  np.testing.assert_array_equal(view.fields['rho'], snapshot.fields['rho'])
+
+
+def test_polar_view(tmp_path):
+  snapshot = Dataset(make_run(tmp_path, geometry='POLAR'))[2]
+  R, phi = np.array(snapshot.grids['x1']), np.array(snapshot.grids['x2'])
+  vR, vphi = np.array(snapshot.fields['vx1']), np.array(snapshot.fields['vx2'])
+  view = to_cartesian(snapshot)
+  np.testing.assert_allclose(view.grids['x1'], R*np.cos(phi), rtol=1e-12, atol=1e-14)
+  np.testing.assert_allclose(view.grids['x3'], snapshot.grids['x3'])
+  np.testing.assert_allclose(view.fields['vx2'], vR*np.sin(phi) + vphi*np.cos(phi), rtol=1e-12)
+  np.testing.assert_array_equal(snapshot.grids['x1'], R)
@@ -0,0 +1,86 @@
+import os
+import functools
+import numpy as np
+
+from PLUTOpy import Dataset, add_field
+from conftest import make_run, values
+
+
+CALLS = []
+
+
+def counted(snapshot):
+  CALLS.append(snapshot.nstep)
+  return ratio(snapshot)
+
+
+def ratio(snapshot, factor=1.0):
+  return factor * snapshot.fields['prs'] / snapshot.fields['rho']
+
+
+def register(name, function):
+  add_field(name, 'scalar', function=function, code_unit='code_velocity**2', astro_unit='km**2/s**2', depends=['rho', 'prs'])
+
+
+def compute(code_dir, name):
+  return np.array(Dataset(code_dir, disk_cache=True, lazy=True)[1].fields[name])
+
+
+def test_rewritten_input_invalidates_cache(tmp_path):
+  code_dir = make_run(tmp_path, filetype='multiple_files')
+  register('_test_ratio', counted)
+  del CALLS[:]
+  first = compute(code_dir, '_test_ratio')
+  np.testing.assert_allclose(compute(code_dir, '_test_ratio'), first)
+  assert len(CALLS) == 1
+
+  # prs is not the first field, its file is hashed as well
+  path = code_dir + 'out/prs.0001.dbl'
+  with open(path, 'wb') as f:
+    f.write((2 * values(1, 4, (8, 6, 4))).tobytes(order='F'))
+  stat = os.stat(path)
+  os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+  np.testing.assert_allclose(compute(code_dir, '_test_ratio'), 2 * first)
+  assert len(CALLS) == 2
+
+
+def test_captured_state_is_hashed(tmp_path):
+  code_dir = make_run(tmp_path)
+  for factor in [1.0, 3.0]:
+    register('_test_closure', lambda s, factor=factor: ratio(s, factor))
+    np.testing.assert_allclose(compute(code_dir, '_test_closure'), factor * compute(code_dir, '_test_ratio_ref'))
+
+
+def test_captured_array_is_hashed_by_contents(tmp_path):
+  code_dir = make_run(tmp_path)
+  table = np.zeros(5000)  # longer than the summarized repr of numpy arrays
+  register('_test_table', lambda s: ratio(s) + table[2500])
+  first = compute(code_dir, '_test_table')
+  table[2500] = 1.0
+  np.testing.assert_allclose(compute(code_dir, '_test_table'), first + 1.0)
+
+
+def test_functions_without_code(tmp_path):
+  code_dir = make_run(tmp_path)
+
+  class Ratio(object):
+    def __call__(self, snapshot):
+      return ratio(snapshot)
+
+  register('_test_partial', functools.partial(ratio, factor=2.0))
+  register('_test_instance', Ratio())
+  np.testing.assert_allclose(compute(code_dir, '_test_partial'), 2 * compute(code_dir, '_test_instance'))
+  register('_test_partial', functools.partial(ratio, factor=5.0))
+  np.testing.assert_allclose(compute(code_dir, '_test_partial'), 5 * compute(code_dir, '_test_instance'))
+
+
+register('_test_ratio_ref', ratio)
+
+
+def test_cached_field_can_be_edited_in_place(tmp_path):
+  code_dir = make_run(tmp_path)
+  first = compute(code_dir, '_test_ratio_ref')
+  snapshot = Dataset(code_dir, disk_cache=True, lazy=True)[1]
+  snapshot.fields['_test_ratio_ref'] *= 2
+  np.testing.assert_allclose(snapshot.fields['_test_ratio_ref'], 2 * first)
+  np.testing.assert_allclose(compute(code_dir, '_test_ratio_ref'), first)
@@ -0,0 +1,43 @@
+import numpy as np
+import astropy.units as u
+import pytest
+
+from PLUTOpy import Dataset
+from PLUTOpy.data_structs.expression import Expression
+from PLUTOpy.pluto_fluid_info import add_field
+from conftest import values
+
+
+def test_names_in_order_of_appearance():
+  expression = Expression('sqrt(vx2*vx2 + rho) * dV - x1')
+  assert expression.names == ['vx2', 'rho', 'dV', 'x1']
+  assert expression.fields == ['vx2', 'rho']
+
+
+@pytest.mark.parametrize('text', ['__import__("os")', 'rho.real', 'rho[0]', 'sum(rho)', 'rho if prs else vx1'])
+def test_unsupported_syntax_is_rejected(text):
+  with pytest.raises(ValueError):
+    Expression(text)
+
+
+@pytest.mark.parametrize('use_numexpr', [False, True])
+def test_evaluate_matches_numpy(monkeypatch, use_numexpr):
+  if use_numexpr and not Expression.use_numexpr:
+    pytest.skip('numexpr is not installed')
+  monkeypatch.setattr(Expression, 'use_numexpr', use_numexpr)
+  monkeypatch.setattr(Expression, 'block_cells', 7)  # blocks not dividing the arrays
+  rng = np.random.default_rng(0)
+  a, b = rng.random((5, 6, 4)) + 0.5, rng.random((5, 6, 1))
+  expression = Expression('-(a + b)**2 / sqrt(a) + 2*arctan2(b, a) - +a')
+  expected = -(a + b)**2 / np.sqrt(a) + 2*np.arctan2(b, a) - a
+  np.testing.assert_allclose(expression.evaluate({'a': a, 'b': b}), expected, rtol=1e-12)
+
+
+def test_expression_field_with_units(spherical):
+  add_field('_test_ratio', 'scalar', expression='prs / rho', code_unit='code_velocity**2', astro_unit='km2/s2')
+  snapshot = Dataset(spherical, with_units=True)[1]
+  ratio = snapshot.fields['_test_ratio']
+  assert ratio.unit.is_equivalent(u.km**2/u.s**2)
+  # UNIT_VELOCITY is 1e8 cm/s = 1e3 km/s
+  expected = values(1, 4, (8, 6, 4)) / values(1, 0, (8, 6, 4)) * 1e6
+  np.testing.assert_allclose(ratio.to_value(u.km**2/u.s**2), expected, rtol=1e-12)
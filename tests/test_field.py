@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from PLUTOpy import Dataset, add_field
+from PLUTOpy.pluto_fluid_info import PlutoFluidInfo
+from conftest import values
+
+
+def test_release_keeps_assigned_fields(spherical):
+  snapshot = Dataset(spherical)[1]
+  snapshot.fields['rho'] = np.ones((8, 6, 4))
+  snapshot.fields['prs'] *= 2
+  snapshot.fields.release()
+  assert set(snapshot.fields.cache_list) == {'rho', 'prs'}
+  np.testing.assert_array_equal(snapshot.fields['rho'], 1)
+  np.testing.assert_array_equal(snapshot.fields['prs'], 2 * values(1, 4, (8, 6, 4)))
+  np.testing.assert_array_equal(snapshot.fields['vx1'], values(1, 1, (8, 6, 4)))
+
+  snapshot.fields.release('rho')  # named explicitly
+  np.testing.assert_array_equal(snapshot.fields['rho'], values(1, 0, (8, 6, 4)))
+
+
+CALLS = []
+
+
+def _a(snapshot):
+  CALLS.append('a')
+  return snapshot.fields['rho'] + snapshot.fields['prs']
+
+
+def _b(snapshot):
+  CALLS.append('b')
+  return snapshot.fields['_test_a'] * snapshot.fields['vx1']
+
+
+add_field('_test_a', 'scalar', function=_a, depends=['rho', 'prs'])
+add_field('_test_b', 'scalar', function=_b, depends=['_test_a', 'vx1'])
+add_field('_test_c', 'scalar', expression='2*_test_b')
+
+
+def test_plan_orders_inputs_first():
+  assert PlutoFluidInfo.plan(['_test_c']) == ['rho', 'prs', '_test_a', 'vx1', '_test_b', '_test_c']
+  assert PlutoFluidInfo.plan(['_test_b', '_test_a']) == ['rho', 'prs', '_test_a', 'vx1', '_test_b']
+  add_field('_test_loop1', 'scalar', expression='_test_loop2 + 1')
+  add_field('_test_loop2', 'scalar', expression='_test_loop1 + 1')
+  with pytest.raises(ValueError):
+    PlutoFluidInfo.plan(['_test_loop1'])
+
+
+def test_compute_releases_intermediate_inputs(spherical):
+  snapshot = Dataset(spherical, lazy=True)[1]
+  del CALLS[:]
+  c, a = snapshot.fields.compute('_test_c', '_test_a')
+  rho, prs, vx1 = (values(1, k, (8, 6, 4)) for k in [0, 4, 1])
+  np.testing.assert_allclose(c, 2 * (rho + prs) * vx1)
+  np.testing.assert_allclose(a, rho + prs)
+  assert CALLS == ['a', 'b']
+  assert '_test_b' not in snapshot.fields.cache_list  # neither requested nor cached before
+  assert {'_test_a', '_test_c'} <= set(snapshot.fields.cache_list)
+
+
+def test_assignment_drops_dependent_fields(spherical):
+  snapshot = Dataset(spherical, lazy=True)[1]
+  snapshot.fields.compute('_test_a', '_test_b', '_test_c')
+  snapshot.fields['vx1'] = np.zeros((8, 6, 4))
+  cached = set(snapshot.fields.cache_list)
+  assert '_test_a' in cached and not cached & {'_test_b', '_test_c'}
+  np.testing.assert_array_equal(snapshot.fields['_test_c'], 0)
+
+  snapshot.fields['rho'] = np.zeros((8, 6, 4))
+  assert not set(snapshot.fields.cache_list) & {'_test_a', '_test_b', '_test_c'}
+  np.testing.assert_array_equal(snapshot.fields['_test_a'], values(1, 4, (8, 6, 4)))
+
+  del CALLS[:]
+  snapshot.fields.update_derived_fields('prs')
+  assert CALLS == ['a']
@@ -0,0 +1,41 @@
+import numpy as np
+
+from PLUTOpy import Dataset
+from PLUTOpy.data_structs.cache import FieldCache
+from conftest import values
+
+
+def test_lru_eviction_within_budget():
+  cache = FieldCache(budget=2*800)
+  for name in ['a', 'b', 'c']:
+    cache[name] = np.zeros(100)
+  assert list(cache) == ['b', 'c']
+  cache['b']  # most recently used
+  cache['d'] = np.zeros(100)
+  assert list(cache) == ['b', 'd']
+  assert cache.evictions == 2
+  assert cache.nbytes <= cache.budget
+
+
+def test_pinned_fixed_and_mapped_arrays_are_kept(tmp_path):
+  cache = FieldCache(budget=800)
+  cache.put('fixed', np.zeros(100), fixed=True)
+  cache['pinned'] = np.zeros(100)
+  cache.pin('pinned')
+  np.save(tmp_path / 'm.npy', np.zeros(1000))
+  cache['mapped'] = np.load(tmp_path / 'm.npy', mmap_mode='r')
+  cache['a'] = np.zeros(100)
+  assert set(cache) == {'fixed', 'pinned', 'mapped', 'a'}  # only the newest array could be evicted
+  cache.unpin('pinned')
+  assert set(cache) == {'fixed', 'mapped'}  # the budget is kept once unpinned
+  assert cache.fixed == {'fixed'}
+
+
+def test_evicted_fields_are_read_again(spherical):
+  snapshot = Dataset(spherical, lazy=True, cache_budget=8*6*4*8)[1]
+  for k, name in enumerate(['rho', 'prs', 'rho']):
+    snapshot.fields.load(name)
+    np.testing.assert_array_equal(np.asarray(snapshot.fields[name]), values(1, 4 if name == 'prs' else 0, (8, 6, 4)))
+  stats = snapshot.fields._cache.stats()
+  assert stats['bytes'] <= stats['budget']
+  assert stats['evictions'] >= 1
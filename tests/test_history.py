@@ -0,0 +1,61 @@
+import os
+import numpy as np
+
+from PLUTOpy.data_structs.reader import HistoryLog
+
+
+def write_rows(f, times):
+  for t in times:
+    f.write(f'{t:.6e} {2*t:.6e} {np.sin(t):.6e}\n')
+
+
+def test_refresh_restart_and_cache(tmp_path):
+  filename = str(tmp_path / 'hist.out')
+  cache_dir = str(tmp_path / 'cache')
+  with open(filename, 'w') as f:
+    f.write('# t mass energy\n')
+    write_rows(f, np.arange(10.))
+    f.write('10.0 20.0')  # the last line is still being written
+  log = HistoryLog(filename, cache_dir)
+  assert log.columns == ['t', 'mass', 'energy']
+  np.testing.assert_array_equal(log['mass'], 2*np.arange(10.))
+  assert not log.refresh()
+
+  with open(filename, 'a') as f:
+    f.write(' 0.0\n# t mass energy\n')  # restart from t = 5, the header is written again
+    write_rows(f, np.arange(5., 12.))
+  assert log.refresh()
+  np.testing.assert_array_equal(log['t'], np.arange(12.))
+
+  cached = HistoryLog(filename, cache_dir)  # later sessions map the cached columns
+  assert isinstance(cached['t'], np.memmap)
+  np.testing.assert_array_equal(cached['energy'], log['energy'])
+  np.testing.assert_array_equal(HistoryLog(filename)['energy'], log['energy'])
+
+
+def test_truncated_cache_is_parsed_again(tmp_path):
+  filename = str(tmp_path / 'hist.out')
+  cache_dir = str(tmp_path / 'cache')
+  with open(filename, 'w') as f:
+    f.write('# t mass energy\n')
+    write_rows(f, np.arange(10.))
+  expected = np.asarray(HistoryLog(filename, cache_dir)['energy']).copy()
+  with open(os.path.join(cache_dir, 'hist.out.002.f8'), 'r+b') as f:
+    f.truncate(24)  # e.g. an interrupted session
+  log = HistoryLog(filename, cache_dir)
+  np.testing.assert_array_equal(log['energy'], expected)
+  np.testing.assert_array_equal(HistoryLog(filename, cache_dir)['energy'], expected)
+
+
+def test_decimate_keeps_extrema(tmp_path):
+  filename = str(tmp_path / 'hist.out')
+  t = np.arange(1000.)
+  with open(filename, 'w') as f:
+    write_rows(f, t)
+  log = HistoryLog(filename)
+  index = log.decimate(30, 'c2')
+  assert len(index) <= 2*30 + 4
+  assert index[0] == 0 and index[-1] == len(t) - 1
+  energy = np.asarray(log['c2'])
+  assert energy.max() in energy[index] and energy.min() in energy[index]
+  assert len(log.frame('c1', points=None)) == len(t)
@@ -0,0 +1,51 @@
+import sys
+import numpy as np
+import pytest
+from matplotlib.colors import LogNorm
+from matplotlib.image import AxesImage, imread
+
+from PLUTOpy.preview import Preview
+from conftest import make_run
+
+
+@pytest.fixture
+def cartesian(tmp_path):
+  return make_run(tmp_path / 'run', geometry='CARTESIAN', shape=(8, 6, 1))
+
+
+@pytest.mark.parametrize('geometry, kwargs', [('CARTESIAN', {}), ('SPHERICAL', {'x3': 0.0, 'regrid': 32})])
+def test_parallel_frames_match_serial(tmp_path, geometry, kwargs):
+  shape = (8, 6, 1) if geometry == 'CARTESIAN' else (8, 6, 4)
+  code_dir = make_run(tmp_path / 'run', geometry=geometry, shape=shape)
+  serial = Preview(code_dir).frames('rho', path=str(tmp_path / 'serial'), workers=1, dpi=40, **kwargs).files
+  parallel = Preview(code_dir).frames('rho', path=str(tmp_path / 'parallel'), workers=2, chunk=1, dpi=40, **kwargs).files
+  assert len(serial) == len(parallel) == 3
+  for a, b in zip(serial, parallel):
+    np.testing.assert_array_equal(imread(a), imread(b))
+  assert not np.array_equal(imread(serial[0]), imread(serial[2]))
+
+
+def test_display_reuses_image(cartesian):
+  preview = Preview(cartesian).display(0, 'rho')
+  image = preview._plot.artist
+  assert isinstance(image, AxesImage)  # uniform grids are drawn by imshow
+  preview.display(2, 'rho')
+  assert preview._plot.artist is image
+  assert len(preview.fig.axes) == 2  # the plot and its colorbar
+  assert isinstance(image.norm, LogNorm)
+  np.testing.assert_allclose(image.get_array()[0], np.asarray(preview._dataset({})[2].fields['rho'])[:, 0])
+
+
+def test_movie_pipes_frames(cartesian, tmp_path):
+  output = str(tmp_path / 'movie.bin')
+  encoder = sys.executable + ' -c "import sys, shutil; shutil.copyfileobj(sys.stdin.buffer, open(sys.argv[1], \'wb\'))" {output}'
+  preview = Preview(cartesian).movie('rho', output=output, encoder=encoder, workers=1, dpi=40)
+  assert preview.files == [output]
+  with open(output, 'rb') as f:
+    assert f.read().count(b'\x89PNG') == 3
+
+
+def test_movie_reports_encoder_errors(cartesian, tmp_path):
+  encoder = sys.executable + ' -c "import sys; sys.stdin.close(); sys.stderr.write(\'unknown codec\'); sys.exit(3)"'
+  with pytest.raises(RuntimeError, match='unknown codec'):
+    Preview(cartesian).movie('rho', output=str(tmp_path / 'movie.bin'), encoder=encoder, workers=1, dpi=40)
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from PLUTOpy import Dataset
+from PLUTOpy.data_structs.reader import Reader
+from conftest import make_run, values, FIELDS
+
+
+@pytest.mark.parametrize('filetype', ['single_file', 'multiple_files'])
+@pytest.mark.parametrize('datatype', ['dbl', 'flt'])
+@pytest.mark.parametrize('endianess', ['little', 'big'])
+def test_fields_match_written_values(tmp_path, filetype, datatype, endianess):
+  code_dir = make_run(tmp_path, filetype=filetype, datatype=datatype, endianess=endianess)
+  dataset = Dataset(code_dir, datatype=datatype, lazy=True)
+  snapshot = dataset[2]
+  reader = snapshot.fields.reader
+  assert isinstance(reader, Reader)
+  assert reader.dtype.itemsize == (8 if datatype == 'dbl' else 4)
+  for k, name in enumerate(FIELDS):  # offsets of fields in single files
+    expected = values(2, k, (8, 6, 4))
+    np.testing.assert_allclose(reader.read(name), expected, rtol=1e-6)
+    np.testing.assert_allclose(reader.read(name, (slice(1, 5), 3)), expected[1:5, 3], rtol=1e-6)
+
+
+def test_2d_fields_are_squeezed(tmp_path):
+  code_dir = make_run(tmp_path, geometry='POLAR', shape=(8, 6, 1))
+  rho = Dataset(code_dir)[1].fields['rho']
+  assert rho.shape == (8, 6)
+  np.testing.assert_array_equal(rho, values(1, 0, (8, 6, 1))[:, :, 0])
+
+
+def test_in_place_edits_leave_files_unchanged(spherical):
+  snapshot = Dataset(spherical)[1]
+  snapshot.fields['rho'] *= 2
+  np.testing.assert_array_equal(snapshot.fields['rho'], 2 * values(1, 0, (8, 6, 4)))
+  np.testing.assert_array_equal(Dataset(spherical)[1].fields['rho'], values(1, 0, (8, 6, 4)))
+
+
+def test_missing_field(spherical):
+  with pytest.raises(KeyError):
+    Dataset(spherical, lazy=True)[0].fields.reader.read('bx1')
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from PLUTOpy import Dataset
+from conftest import make_run
+
+
+@pytest.fixture
+def dataset(tmp_path):
+  return Dataset(make_run(tmp_path, geometry='CARTESIAN'), with_units=False)
+
+
+def weighted_histogram(x, y, w, xedges, yedges):
+  ''' reference phase diagram, the right edges are included in the last bins like numpy.histogram2d '''
+
+  return np.histogram2d(np.ravel(x), np.ravel(y), bins=[xedges, yedges], weights=np.ravel(w))[0]
+
+
+def test_profile_matches_bincount_by_hand(dataset):
+  snapshot = dataset[1]
+  rho = np.asarray(snapshot.fields['rho'])
+  dV = snapshot.grids['dV']
+  x = np.broadcast_to(snapshot.coord['x1'][:, None, None], rho.shape)
+  edges, prof = snapshot.profile('rho', 'x1', bins=[-1., 0., 1.], chunk=2)
+  i = np.digitize(x, edges) - 1
+  expected = [np.sum((rho*dV)[i == k]) / np.sum(dV[i == k]) for k in range(2)]
+  np.testing.assert_allclose(prof, expected, rtol=1e-12)
+
+
+def test_phase_sums_weights_in_range(dataset):
+  snapshot = dataset[1]
+  rho = np.asarray(snapshot.fields['rho'])
+  prs = np.asarray(snapshot.fields['prs'])
+  hist, xedges, yedges = snapshot.phase('rho', 'prs', bins=(4, 5), range=((2, 10), (2, 30)), chunk=3)
+  assert hist.shape == (4, 5)
+  expected = weighted_histogram(rho, prs, snapshot.grids['dV'], xedges, yedges)
+  np.testing.assert_allclose(hist, expected, rtol=1e-12)
+
+
+def test_phase_1d_bins_are_shared_edges(dataset):
+  snapshot = dataset[1]
+  edges = np.array([0., 40.])
+  hist, xedges, yedges = snapshot.phase('rho', 'prs', bins=edges)
+  np.testing.assert_array_equal(xedges, edges)
+  np.testing.assert_array_equal(yedges, edges)
+  assert hist.shape == (1, 1)
+  assert hist.sum() == pytest.approx(np.sum(snapshot.grids['dV']))
+
+
+def test_dataset_phase_sums_snapshots_without_reading_others(dataset, monkeypatch):
+  limits = ((0, 20), (0, 60))
+  expected = sum(dataset[ns].phase('rho', 'prs', bins=[4, 3], range=limits)[0] for ns in [1, 2])
+
+  opened = []
+  getitem = Dataset.__getitem__
+  monkeypatch.setattr(Dataset, '__getitem__', lambda self, index: opened.append(index) or getitem(self, index))
+  hist, xedges, yedges = dataset.phase('rho', 'prs', bins=[4, 3], range=limits, indices=[1, 2])
+  assert opened == [1, 2]
+  np.testing.assert_allclose(hist, expected, rtol=1e-12)
+  np.testing.assert_array_equal(xedges, np.linspace(0, 20, 5))
+  np.testing.assert_array_equal(yedges, np.linspace(0, 60, 4))
+  with pytest.raises(ValueError):
+    dataset.phase('rho', 'prs', bins=4, range=None)
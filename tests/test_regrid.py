@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from PLUTOpy import Dataset
+from conftest import LIMITS, values
+
+
+def pixel_coordinates(regridder):
+  ''' spherical (r, theta) of pixels on a meridional plane '''
+
+  R, z = np.meshgrid(*regridder.coords, indexing='ij')
+  return np.hypot(R, z), np.arctan2(R, z)
+
+
+@pytest.mark.parametrize('ns', [1, 2])  # the map is reused by snapshots
+def test_nearest_matches_containing_cell(spherical, ns):
+  dataset = Dataset(spherical, with_units=False)
+  regridder = dataset.regridder(resolution=24, x3=0)
+  assert regridder is dataset[ns].regridder(resolution=24, x3=0)
+  out = regridder.apply(dataset[ns].fields['rho'][regridder.index])
+
+  r, theta = pixel_coordinates(regridder)
+  (r0, r1), (t0, t1), _ = LIMITS['SPHERICAL']
+  i = np.floor((r - r0) / (r1 - r0) * 8).astype(int)
+  j = np.floor((theta - t0) / (t1 - t0) * 6).astype(int)
+  inside = (i >= 0) & (i < 8) & (j >= 0) & (j < 6)
+  expected = values(ns, 0, (8, 6, 4))[np.clip(i, 0, 7), np.clip(j, 0, 5), 0]
+  assert inside.sum() > out.size // 3
+  np.testing.assert_array_equal(out[inside], expected[inside])
+  assert np.all(np.isnan(out[~inside]))
+
+
+def test_linear_matches_interpolation(spherical):
+  dataset = Dataset(spherical, with_units=False)
+  regridder = dataset.regridder(resolution=24, x3=0, method='linear')
+  out = regridder.apply(dataset[2].fields['prs'][regridder.index])
+
+  # values are linear in cell indices, so in r and theta on the uniform grid, clamped at the outermost centers
+  r, theta = pixel_coordinates(regridder)
+  (r0, r1), (t0, t1), _ = LIMITS['SPHERICAL']
+  x = (r - r0) / (r1 - r0) * 8 - 0.5
+  y = (theta - t0) / (t1 - t0) * 6 - 0.5
+  inside = (x >= -0.5) & (x <= 7.5) & (y >= -0.5) & (y <= 5.5)
+  expected = 1 + 2 + 5 * (np.clip(x, 0, 7) + 0.1 * np.clip(y, 0, 5))
+  assert inside.sum() > out.size // 3
+  np.testing.assert_allclose(out[inside], expected[inside], rtol=1e-10)
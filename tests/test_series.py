@@ -0,0 +1,48 @@
+import threading
+import numpy as np
+
+from PLUTOpy import Dataset
+from PLUTOpy.data_structs.reader import OutputLog
+from conftest import make_run, values
+
+
+def test_prefetch_opens_snapshots_in_calling_thread(spherical, monkeypatch):
+  dataset = Dataset(spherical, lazy=True)
+  threads = []
+  getitem = Dataset.__getitem__
+  monkeypatch.setattr(Dataset, '__getitem__', lambda self, index: threads.append(threading.current_thread()) \
+      or getitem(self, index))
+  numbers = []
+  for snapshot in dataset.series(fields=['rho'], prefetch=2):
+    numbers.append(snapshot.nstep)
+    assert not isinstance(snapshot.fields['rho'], np.memmap)
+    np.testing.assert_allclose(np.asarray(snapshot.fields['rho']), values(snapshot.nstep, 0, (8, 6, 4)))
+  assert numbers == [0, 1, 2]
+  assert threads and all(t is threading.main_thread() for t in threads)
+
+
+def test_output_log_nearest_and_position(tmp_path):
+  log = OutputLog(make_run(tmp_path, nout=5) + 'out/dbl.out')
+  assert [log.nearest(t) for t in [-1., 0.2, 0.3, 1.1, 9.]] == [0, 0, 1, 2, 4]
+  assert log.position(3) == 3
+  assert log.info(2) == (1.0, 1e-3)
+  assert log.last() == 4
+
+
+def test_output_log_refresh_appends_and_restarts(tmp_path):
+  filename = make_run(tmp_path, nout=3) + 'out/dbl.out'
+  log = OutputLog(filename)
+  assert not log.refresh()
+  with open(filename, 'a') as f:
+    f.write('3 1.5 1e-3 300 single_file little rho\n4 2.0 1e-3')  # the last line is still being written
+  assert log.refresh()
+  assert log.nfile.tolist() == [0, 1, 2, 3]
+  with open(filename, 'a') as f:
+    f.write(' 400 single_file little rho\n2 1.2 1e-3 250 single_file little rho\n')  # restart from output 2
+  assert log.refresh()
+  assert log.nfile.tolist() == [0, 1, 2]
+  assert log.info(2) == (1.2, 1e-3)
+  with open(filename, 'w') as f:  # rewritten from scratch
+    f.write('0 0.0 1e-3 0 single_file little rho\n')
+  assert log.refresh()
+  assert log.nfile.tolist() == [0]
@@ -0,0 +1,36 @@
+import os
+import numpy as np
+import pytest
+
+from PLUTOpy import Dataset
+from conftest import make_run, values
+
+
+def test_convert_round_trip(spherical):
+  dataset = Dataset(spherical, lazy=True)
+  dataset.convert(indices=[0, 1], chunks=(3, 4, 3))
+  store = Dataset(spherical, datatype='store', lazy=True)
+  assert store._log.nfile.tolist() == [0, 1]
+  assert store[1].time == dataset[1].time
+  np.testing.assert_array_equal(store[1].coord['x1'], dataset[1].coord['x1'])
+  for k, name in enumerate(store.field_list):
+    np.testing.assert_array_equal(np.asarray(store[1].fields[name]), values(1, k, (8, 6, 4)))
+  # regions spanning several chunks, with steps and negative indices
+  reader = store[0].fields.reader
+  for index in [(slice(1, 7), slice(None, None, 2), -1), (2, slice(5, 0, -2)), (slice(8, 8),)]:
+    np.testing.assert_array_equal(reader.read('prs', index), values(0, 4, (8, 6, 4))[index])
+
+  dataset.convert()  # only the new output is converted
+  assert Dataset(spherical, datatype='store')._log.nfile.tolist() == [0, 1, 2]
+  with pytest.raises(ValueError):
+    dataset.convert(chunks=(8, 6, 4))
+
+
+def test_convert_downcasts(tmp_path):
+  code_dir = make_run(tmp_path, geometry='POLAR', shape=(8, 6, 1))
+  Dataset(code_dir).convert(dtype='f4')
+  store = Dataset(code_dir, datatype='store', with_units=True)
+  rho = store[2].fields['rho']
+  assert rho.dtype == np.float32
+  np.testing.assert_allclose(rho.value, Dataset(code_dir, with_units=True)[2].fields['rho'].value, rtol=1e-6)
+  assert os.path.exists(code_dir + 'out/store/grid.npz')
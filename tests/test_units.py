@@ -0,0 +1,41 @@
+import numpy as np
+import astropy.units as u
+import pytest
+
+from PLUTOpy import Dataset
+from conftest import make_run
+
+
+@pytest.fixture(params=[('SPHERICAL', (8, 6, 4)), ('POLAR', (8, 6, 1))], ids=['spherical', 'polar'])
+def run(request, tmp_path):
+  geometry, shape = request.param
+  return make_run(tmp_path, geometry=geometry, shape=shape, unit_length='1.e20')
+
+
+def test_geometry_metadata_matches_quantities(run):
+  quantity = Dataset(run, with_units=True)[1]
+  metadata = Dataset(run, with_units='metadata')[1]
+  for key in ['h2', 'h3', 'dA1', 'dA2', 'dA3', 'dV']:
+    q = u.Quantity(quantity.grids[key])
+    m = np.asarray(metadata.grids[key]) * metadata.grids.scale(key) * metadata.grids.unit(key)
+    assert m.unit.is_equivalent(q.unit)
+    np.testing.assert_allclose(m.to_value(q.unit), q.value, rtol=1e-12)
+  assert metadata.grids.unit('dV') == u.kpc**3
+  assert metadata.grids.unit('dA1') == u.kpc**2
+
+
+def test_spherical_volume_in_astro_units(tmp_path):
+  snapshot = Dataset(make_run(tmp_path, unit_length='1.e20'), with_units=True)[0]
+  # dV = r^2 dr sin(theta) dtheta dphi at cell centers
+  length = (1e20 * u.cm).to_value(u.kpc)
+  r = np.linspace(0.1, 1.0, 9) * length
+  theta = np.linspace(0.1, np.pi-0.1, 7)
+  rc, tc = 0.5*(r[1:]+r[:-1]), 0.5*(theta[1:]+theta[:-1])
+  expected = np.sum(rc**2 * np.diff(r)) * np.sum(np.sin(tc) * np.diff(theta)) * 2*np.pi
+  assert u.Quantity(snapshot.grids['dV']).sum().to_value(u.kpc**3) == pytest.approx(expected, rel=1e-12)
+
+
+def test_total_mass_metadata_matches_quantities(run):
+  quantity = Dataset(run, with_units=True)[1].total_mass()
+  metadata = Dataset(run, with_units='metadata')[1].total_mass()
+  assert metadata.to_value(u.Msun) == pytest.approx(quantity.to_value(u.Msun), rel=1e-12)
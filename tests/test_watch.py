@@ -0,0 +1,45 @@
+import time
+import threading
+import numpy as np
+
+from PLUTOpy import Dataset
+from conftest import FIELDS, values
+
+
+def write_output(code_dir, ns, shape=(8, 6, 4), fraction=1.0):
+  ''' write (a part of) the data file of output ns, and its line in the log once complete '''
+
+  data = b''.join(values(ns, k, shape).astype('<f8').tobytes(order='F') for k in range(len(FIELDS)))
+  with open(code_dir+f'out/data.{ns:04d}.dbl', 'wb') as f:
+    f.write(data[:int(len(data)*fraction)])
+
+
+def append_log(code_dir, ns):
+  with open(code_dir+'out/dbl.out', 'a') as log:
+    log.write(f'{ns} {ns*0.5:.6e} 1.000000e-03 {ns*100} single_file little '+' '.join(FIELDS)+'\n')
+
+
+def test_watch_yields_new_complete_outputs(spherical):
+  dataset = Dataset(spherical, lazy=True)
+  watch = dataset.watch(interval=0.01, timeout=2.0)
+
+  def simulation():  # the log line is written while the data file is still incomplete
+    write_output(spherical, 3, fraction=0.5)
+    append_log(spherical, 3)
+    time.sleep(0.1)
+    write_output(spherical, 3)
+
+  timer = threading.Timer(0.1, simulation)
+  timer.start()
+  snapshot = next(watch)
+  timer.join()
+  assert snapshot.nstep == 3
+  np.testing.assert_array_equal(snapshot.fields['prs'], values(3, 4, (8, 6, 4)))
+
+
+def test_follow_from_start(spherical):
+  dataset = Dataset(spherical, lazy=True)
+  numbers = []
+  assert dataset.follow(lambda s: numbers.append(s.nstep), start=1, interval=0.01, timeout=0.05) == 2
+  assert numbers == [1, 2]
+  assert dataset.follow(numbers.append, interval=0.01, timeout=0.05) == 0  # only outputs written from now on